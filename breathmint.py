@@ -28,157 +28,1562 @@ import sys
 import re
 import html
 import unicodedata
+import concurrent.futures
+import contextlib
+import collections.abc
+import hashlib
+import base64
+import pickle
+import time
+import functools
+import mmap
+import multiprocessing
+import queue
+import tempfile
+import fnmatch
+import gzip
+import lzma
+import bz2
+import zipfile
 
 #
+#	lxml is only needed for the lxml parser backend ('--parser lxml')
+try:
+	import lxml.etree
+except ImportError:
+	lxml = None
+
+#
+#	zstandard is only needed to read zstd compressed Burp files
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+#
+#
+# -- import private modules --
+#
+#
+import excelsify
+import make_me_pretty
+import mint_tin
+import exportify
+import stopwatch
+
+#
+#
+# -- Global variables --
+#
+#
+RISK_VALUES = ["Critical", "High", "Medium", "Low", "Informational"]
+RISK_SYNONYM_MAPPING = {'None':"Informational", 'Info':"Informational", 'Information':"Informational", 'Moderate':"Medium"}
+SORT_ORDER_RISK = {"Critical":0, "High":1, "Medium":2, "Low":3, "Informational":4}
+ISSUE_OPEN_TAG = b'<issue>'
+#
+#	Burp file discovery (find_burp_output): file name globs to include by default, bytes read from each candidate to check
+#		its root burpVersion attribute (fed to the XML parser DISCOVERY_FEED_BYTES at a time, until the root start tag is found),
+#		and threads used to read those headers
+DISCOVERY_INCLUDE_DEFAULT = ["*.xml", "*.xml.gz", "*.xml.xz", "*.xml.bz2", "*.xml.zst", "*.zip"]
+DISCOVERY_HEADER_BYTES = 64 * 1024
+DISCOVERY_FEED_BYTES = 4 * 1024
+DISCOVERY_THREADS = 8
+#
+#	Burp file inputs (see open_burp_input): '-' reads standard input, '<<zip file>>!<<member>>' reads one member of a zip file,
+#	and gzip, xz, bz2 and zstd compressed data is recognized by its magic bytes and decompressed as it is read
+STDIN_INPUT = "-"
+ZIP_MEMBER_SEPARATOR = "!"
+COMPRESSION_MAGIC = [(b'\x1f\x8b', 'gzip'), (b'\xfd7zXZ\x00', 'xz'), (b'BZh', 'bz2'), (b'\x28\xb5\x2f\xfd', 'zstd')]
+COMPRESSION_EXTENSIONS = [".gz", ".xz", ".bz2", ".zst"]
+#
+#	issue field names (the keys used by excelsify and the rest of the code) and the matching Issue attribute names, in output order
+ISSUE_FIELDS = [('Serial Number', 'serial_number'), ('Vulnerability Name', 'name'), ('Background', 'background'), ('Product Name', 'product_name'), ('Remediation', 'remediation'), ('References', 'references'), ('Classification', 'classification'), ('Risk', 'risk'), ('Severity', 'severity'), ('Confidence', 'confidence'), ('IP', 'ip'), ('URI', 'uri'), ('FQDN', 'fqdn'), ('Port', 'port'), ('Protocol', 'protocol'), ('Path', 'path'), ('Location', 'location'), ('Target Details', 'target_details'), ('Issue Details', 'issue_details'), ('Request Response', 'request_response')]
+ISSUE_ATTRIBUTES = dict(ISSUE_FIELDS)
+#
+#	Issue attributes that are the same for every instance of a Burp issue type; see share_issue_values
+SHARED_ISSUE_ATTRIBUTES = ['name', 'background', 'remediation', 'references', 'classification']
+#
+#	fields that parse_issue has already run through NFKD, fix_spacing_issues and remove_lxml_markup (see normalize_text);
+#		create_workbook skips the render passes that would repeat that work (see excelsify.render_normalized_cell)
+NORMALIZED_ISSUE_FIELDS = ['Background', 'Remediation', 'Issue Details']
+SHARED_VALUES = {}
+#
+#	one <a ... href=...>display text</a> anchor; the href may be double, single or un-quoted and come after other attributes
+ATAG_PATTERN = re.compile(r'<a\s[^>]*?(?<![\w-])href\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))[^>]*>(.*?)</a\s*>', re.IGNORECASE | re.DOTALL)
+#
+#	number of distinct raw texts kept by normalize_text, extract_atags and reference_urls
+#	the same issue type repeats the same background/remediation/references text, so this only needs to cover the distinct issue types
+NORMALIZE_CACHE_SIZE = 4096
+#
+#	cache hit/miss counts reported back by worker processes; see worker_task
+WORKER_CACHE_COUNTS = {}
+#
+#	XML parser backends for iterate_burp_issues ('--parser'); 'etree' is xml.etree.ElementTree, 'lxml' is lxml.etree with
+#		huge_tree (no limit on text node size/tree depth) and recover (keep what can be read from a broken or truncated file)
+#		entities are never resolved and nothing is fetched over the network (resolve_entities=False, no_network=True), set
+#		explicitly since older lxml releases resolve external entities by default
+PARSER_BACKENDS = ['etree', 'lxml']
+#
+#	Burp <issue> child tag -> [(field name, extractor), ...]; see extract_issue_fields
+#		each extractor gets the child element and returns the field value; parse_issue does the rest (defaults, combining fields,
+#		the final text clean-up). A new Burp tag (or attribute) is mapped by adding it here
+ISSUE_TAG_FIELDS = {
+	'serialNumber':[('serial_number', lambda element: element.text)],
+	'name':[('name', lambda element: element.text)],
+	'host':[('ip', lambda element: element.get('ip')), ('uri', lambda element: element.text)],
+	'path':[('path', lambda element: element.text)],
+	'location':[('location', lambda element: element.text)],
+	'severity':[('severity_risk', lambda element: severity_risk(severity_element=element))],
+	'confidence':[('confidence', lambda element: element.text)],
+	'issueBackground':[('background', lambda element: normalize_text(contents=element.text))],
+	'remediationBackground':[('remediation', lambda element: normalize_text(contents=element.text))],
+	'references':[('references', lambda element: reference_urls(html_string=element.text))],
+	'vulnerabilityClassifications':[('classification', lambda element: reference_urls(html_string=element.text))],
+	'issueDetail':[('issue_detail', lambda element: element.text)],
+	'issueDetailItems':[('issue_detail_items', lambda element: [item.text for item in element.iter('issueDetailItem')])],
+	'remediationDetail':[('remediation_detail', lambda element: element.text)],
+	'requestresponse':[('request_response', lambda element: element)]}
+#
+#	pipelined parse -> write ('--pipeline'); see pipeline_producer and pipeline_issues
+#		issues travel from the producer process in batches of PIPELINE_BATCH_SIZE records, at most PIPELINE_QUEUE_SIZE batches
+#		at a time (the producer waits while the queue is full); the writer keeps at most PIPELINE_BUFFER_SIZE issues of the
+#		risks it cannot write yet in memory and spills the rest to temporary files
+PIPELINE_BATCH_SIZE = 500
+PIPELINE_QUEUE_SIZE = 8
+PIPELINE_BUFFER_SIZE = 20000
+PIPELINE_POLL_SECONDS = 1
+#
+#	functions timed by '--profile' (see enable_profiling), per module; the PROFILE_TEXT_FUNCTIONS also count characters in/out
+PROFILE_FUNCTIONS = {
+	'breathmint':['find_burp_output', 'parse_files', 'parse_file', 'parse_file_part', 'parse_issue', 'parse_cache_key', 'load_parse_cache', 'store_parse_cache', 'split_burp_file', 'store_file_issues', 'group_issues'],
+	'excelsify':['create_worksheet_data', 'create_workbook', 'create_render_plan', 'set_worksheet_formatting', 'add_chart_worksheet'],
+	'exportify':['export_worksheet'],
+	'mint_tin':['open_issue_store', 'store_issues', 'count_issues']}
+PROFILE_TEXT_FUNCTIONS = {
+	'breathmint':['extract_atags', 'normalize_text', 'reference_urls'],
+	'excelsify':['render_cell', 'render_normalized_cell'],
+	'make_me_pretty':['safe_to_write_string', 'remove_lxml_markup', 'strip_markup_fast', 'fix_spacing_issues', 'target_pretty']}
+#
+#	duplicate issue removal (--dedupe); the identity of an issue is either its serialNumber or a hash of its content
+#		(see issue_identity); DUPLICATE_COUNTS['removed'] counts the duplicates dropped in this process
+DEDUPE_MODES = ['serial', 'content']
+DEDUPE_CONTENT_TAGS = ['name', 'host', 'path', 'location', 'issueDetail']
+DUPLICATE_COUNTS = {'removed':0}
+#
+#	on-disk parse cache (--cache-dir); bump PARSE_CACHE_VERSION whenever a change to the parser changes the parsed issues
+#		(also the version of the issues kept in the issue database; see mint_tin.open_issue_store)
+#	note: cache entries are pickles, so only use a cache directory you trust
+PARSE_CACHE_VERSION = "4"
+PARSE_CACHE_HASH_CHUNK_SIZE = 1024 * 1024
+
+#
+#
+# -- Function declarations --
+#
+#
+
+#
+#
+#	breathmint_logo
+#
+#		tis a silly little function to return a logo as a string
+#
+#
+def breathmint_logo():
+	try:
+		retval = ""
+		retval = retval + "                              /||-----||/\n"
+		retval = retval + "                            |-------------|/\n"
+		retval = retval + "                           -----------------|\n"
+		retval = retval + "                          |------------------/\n"
+		retval = retval + "                          //////////|--------|\n"
+		retval = retval + ".......--------------------------------------|      ////\n"
+		retval = retval + "_......-------------------------------------/  /||--------||\n"
+		retval = retval + "-......------------------------------------/  |--------------|\n"
+		retval = retval + "/......----------------------------------/   ------------------\n"
+		retval = retval + " --------------------------||||||||||||/    |------------------|\n"
+		retval = retval + "  ___________________________________________//////////|-------|\n"
+		retval = retval + "  /........----------------------------------------------------|\n"
+		retval = retval + "   /.......----------------------------------------------------/\n"
+		retval = retval + "    /_.....--------------------------------------------------/\n"
+		retval = retval + "      -....------------------------------------------------|/\n"
+		retval = retval + "       --------------------------------------------------//\n"
+		retval = retval + "          ______________________________________\n"
+		retval = retval + "           /-..._________------------------------|\n"
+		retval = retval + "              |-_________--------------------------/\n"
+		retval = retval + "                 /|-_____---------------------------/\n"
+		retval = retval + "                      /||---------------------------|\n"
+		retval = retval + "                                 //////////|--------|\n"
+		retval = retval + "                                 |------------------/\n"
+		retval = retval + "                                  -----------------|\n"
+		retval = retval + "                                   |-------------|/\n"
+		retval = retval + "                                     /||-----||/\n"
+		retval = retval + "\n\nby FYRM Associates\n"
+		return retval
+	except Exception as e:
+		print('\n==== Exception ====\n  breathmint.breathmintLogo()\n----')
+		print(e)
+		traceback.print_exc()
+		print('\n===================')
+		print('(this is really embarrassing)')
+		return 'breathmint'
+
+
+#
+#
+#	header_root
+#
+#		root element of a Burp xml file, from the start of the file
+#		the header is parsed only up to the root start tag; anything after it (even something that is not well-formed) is ignored
+#
+#		parameters:
+#			header - the first bytes of the file; enough to hold the root start tag (everything before the first <issue> will do)
+#
+#		returns:
+#			root element (attributes only, no children), or None if the header ends before the root start tag
+#			raises ET.ParseError if the header is not well-formed before the root start tag
+#
+#
+def header_root(header):
+	header_parser = ET.XMLPullParser(events=('start',))
+	for position in range(0, len(header), DISCOVERY_FEED_BYTES):
+		header_parser.feed(header[position:position + DISCOVERY_FEED_BYTES])
+		#	an error later in the same chunk is queued after the root start event, so it is never raised here
+		for event, element in header_parser.read_events():
+			return element
+	return None
+
+
+#
+#
+#	header_burp_version
+#
+#		root burpVersion attribute from the start of a Burp xml file (see header_root)
+#
+#		returns:
+#			burpVersion value, or None if the header does not start a Burp xml file (or is not well-formed before the root start tag)
+#
+#
+def header_burp_version(header):
+	try:
+		root = header_root(header=header)
+	except ET.ParseError:
+		return None
+	if root == None:
+		return None
+	return root.get('burpVersion')
+
+
+#
+#
+#	sniff_burp_file
+#
+#		check a candidate file by reading only its first DISCOVERY_HEADER_BYTES bytes (see header_root), so a large
+#		non-Burp xml file is never parsed as a whole
+#
+#		returns:
+#			(True|False, "<<reason the file is skipped>>")
+#
+#
+def sniff_burp_file(file):
+	try:
+		with open_burp_input(file) as f:
+			header = f.read(DISCOVERY_HEADER_BYTES)
+	except Exception as e:
+		return (False, "could not read it: " + str(e))
+	try:
+		root = header_root(header=header)
+	except ET.ParseError as e:
+		return (False, "not well-formed xml before the root element: " + str(e))
+	if root == None:
+		return (False, "no root element in the first " + str(DISCOVERY_HEADER_BYTES) + " bytes")
+	burp_version = root.get('burpVersion')
+	if (burp_version == None or burp_version == ""):
+		return (False, "not a Burp xml issue export: the root element has no burpVersion attribute")
+	return (True, "")
+
+
+#
+#
+#	find_burp_output
+#
+#		find all Burp output files in the given directory and its subdirectories
+#
+#		the tree is walked with os.scandir (subdirectories in name order, symlinked directories are not followed); each file
+#		matching the include globs (compressed files included, zip files are searched for matching members; see zip_burp_members)
+#		is then checked with sniff_burp_files
+#
+#		parameters:
+#			directory - directory to search
+#			include - file globs to consider (default == DISCOVERY_INCLUDE_DEFAULT)
+#			exclude - globs for files and subdirectories to skip
+#			globs are matched against both the name and the path relative to directory (e.g. "*.xml", "old/*", "*-draft.xml")
+#
+#		returns:
+#			list of Burp files, as paths (directory joined with the relative path), in walk order
+#
+#
+def find_burp_output(directory, include=None, exclude=[]):
+	try:
+		if include == None:
+			include = DISCOVERY_INCLUDE_DEFAULT
+		candidates = []
+		directories = [""]
+		while not directories == []:
+			relative_directory = directories.pop()
+			subdirectories = []
+			with os.scandir(os.path.join(directory, relative_directory)) as entries:
+				for entry in sorted(entries, key=lambda entry: entry.name):
+					relative_path = entry.name if relative_directory == "" else relative_directory + "/" + entry.name
+					if any(fnmatch.fnmatch(entry.name, glob) or fnmatch.fnmatch(relative_path, glob) for glob in exclude):
+						continue
+					if entry.is_dir(follow_symlinks=False):
+						subdirectories.append(relative_path)
+					elif (entry.is_file() and not entry.name.startswith("~$")):
+						if any(fnmatch.fnmatch(entry.name, glob) or fnmatch.fnmatch(relative_path, glob) for glob in include):
+							file = os.path.normpath(os.path.join(directory, relative_path))
+							if entry.name.lower().endswith(".zip"):
+								candidates.extend(zip_burp_members(zip_file=file, include=include, exclude=exclude))
+							else:
+								candidates.append(file)
+			#	depth first, in name order
+			directories.extend(reversed(subdirectories))
+		return sniff_burp_files(candidates=candidates)
+	except Exception as e:
+		print('\n==== Exception ====\n  breathmint.find_burp_output()\n----')
+		print(e)
+		traceback.print_exc()
+		print("===================")
+		return []
+
+
+#
+#
+#	sniff_burp_files
+#
+#		check candidate files with sniff_burp_file, DISCOVERY_THREADS files at a time
+#
+#		returns:
+#			list of the candidates that are Burp files, in candidates order
+#
+#
+def sniff_burp_files(candidates):
+	files = []
+	with concurrent.futures.ThreadPoolExecutor(max_workers=DISCOVERY_THREADS) as executor:
+		for file,(is_burp_file, skip_reason) in zip(candidates, executor.map(sniff_burp_file, candidates)):
+			if is_burp_file == True:
+				print('Found ' + file)
+				files.append(file)
+			else:
+				print('Skipping ' + file + ' (' + skip_reason + ')')
+	return files
+
+
+#
+#
+#	zip_burp_members
+#
+#		members of a zip file that match the include globs (and none of the exclude globs); zip files inside the zip are not searched
+#
+#		returns:
+#			list of '<<zip_file>>!<<member>>' inputs (see open_burp_input), in zip order
+#
+#
+def zip_burp_members(zip_file, include=None, exclude=[]):
+	if include == None:
+		include = DISCOVERY_INCLUDE_DEFAULT
+	members = []
+	try:
+		with zipfile.ZipFile(zip_file) as archive:
+			for member in archive.infolist():
+				name = member.filename.rsplit("/", 1)[-1]
+				if (member.is_dir() or name.lower().endswith(".zip") or name.startswith("~$")):
+					continue
+				if any(fnmatch.fnmatch(name, glob) or fnmatch.fnmatch(member.filename, glob) for glob in exclude):
+					continue
+				if any(fnmatch.fnmatch(name, glob) or fnmatch.fnmatch(member.filename, glob) for glob in include):
+					members.append(zip_file + ZIP_MEMBER_SEPARATOR + member.filename)
+	except (OSError, zipfile.BadZipFile) as e:
+		print("Warning: find_burp_output: could not read zip file \"" + str(zip_file) + "\": " + str(e))
+	return members
+
+
+#
+#
+#	zip_member
+#
+#		split a '<<zip file>>!<<member>>' input into its parts
+#
+#		returns:
+#			(zip_file, member), or (file, None) if file is not a zip member
+#
+#
+def zip_member(file):
+	separator_index = file.lower().find(".zip" + ZIP_MEMBER_SEPARATOR)
+	if separator_index < 0:
+		return (file, None)
+	return (file[:separator_index + 4], file[separator_index + 4 + len(ZIP_MEMBER_SEPARATOR):])
+
+
+#
+#
+#	compression_format
+#
+#		returns:
+#			'gzip'|'xz'|'bz2'|'zstd' for compressed data (see COMPRESSION_MAGIC), None for anything else
+#
+#
+def compression_format(header):
+	for magic,format_name in COMPRESSION_MAGIC:
+		if header.startswith(magic):
+			return format_name
+	return None
+
+
+#
+#
+#	open_burp_input
+#
+#		open a Burp file input for reading, as a binary stream of the xml
+#
+#		nothing is written to disk: compressed data is decompressed while it is read and zip members are read straight
+#		out of the zip file, so the parser sees the xml as one stream either way
+#
+#		parameters:
+#			file - one of:
+#				a Burp xml file name
+#				STDIN_INPUT ('-') for standard input
+#				'<<zip file>>!<<member>>' for one member of a zip file (see zip_burp_members)
+#				gzip, xz, bz2 or zstd compressed versions of any of the above (recognized by content, not by file name)
+#
+#		returns:
+#			context manager for the stream
+#
+#
+@contextlib.contextmanager
+def open_burp_input(file):
+	with contextlib.ExitStack() as stack:
+		if file == STDIN_INPUT:
+			raw = sys.stdin.buffer
+		else:
+			zip_file, member = zip_member(file)
+			if member == None:
+				raw = stack.enter_context(open(file, 'rb'))
+			else:
+				archive = stack.enter_context(zipfile.ZipFile(zip_file))
+				raw = stack.enter_context(archive.open(member))
+		format_name = compression_format(header=raw.peek(8))
+		if format_name == 'gzip':
+			raw = stack.enter_context(gzip.GzipFile(fileobj=raw, mode='rb'))
+		elif format_name == 'xz':
+			raw = stack.enter_context(lzma.LZMAFile(raw))
+		elif format_name == 'bz2':
+			raw = stack.enter_context(bz2.BZ2File(raw))
+		elif format_name == 'zstd':
+			if zstandard == None:
+				raise ValueError("\"" + str(file) + "\" is zstd compressed; reading it needs the zstandard module (pip install zstandard)")
+			raw = stack.enter_context(zstandard.ZstdDecompressor().stream_reader(raw, closefd=False))
+		yield raw
+
+
+#
+#
+#	plain_input
+#
+#		returns:
+#			True if file is an uncompressed file on disk (one that can be memory-mapped, split and hashed as-is), else False
+#
+#
+def plain_input(file):
+	if (file == STDIN_INPUT or not zip_member(file)[1] == None):
+		return False
+	with open(file, 'rb') as f:
+		return compression_format(header=f.read(8)) == None
+
+
+#
+#
+#	input_position
+#
+#		returns:
+#			bytes of xml read from an open_burp_input stream so far, or None if the stream cannot tell (e.g. a pipe)
+#
+#
+def input_position(source):
+	try:
+		return source.tell()
+	except (OSError, ValueError, AttributeError):
+		return None
+
+
+#
+#
+#	input_source_name
+#
+#		name a Burp file input is known by in the parse cache and issue database (absolute path; standard input stays '-')
+#
+#
+def input_source_name(file):
+	if file == STDIN_INPUT:
+		return file
+	return os.path.abspath(file)
+
+
+#
+#
+#	output_base_name
+#
+#		default output file name base for a single Burp file input: the input name without its compression and .xml
+#		extensions ('<<zip file>>--<<member>>' for a zip member; "burp-output" for standard input)
+#
+#
+def output_base_name(file):
+	if file == STDIN_INPUT:
+		return "burp-output"
+	zip_file, member = zip_member(file)
+	if not member == None:
+		file = zip_file[:-len(".zip")] + "--" + member.rsplit("/", 1)[-1]
+	for extension in COMPRESSION_EXTENSIONS:
+		if file.lower().endswith(".xml" + extension):
+			file = file[:-len(extension)]
+			break
+	return file.replace(".xml", "")
+
+
+#
+#
+#	extract_atags
+#
+#		get the url and displaytext of every anchor in the html string, in one pass with ATAG_PATTERN
+#		useful for the references and classification content in Burp XML output
+#
+#		the references item is a single string containing HTML tags: <ul>, <li>, <a>
+#		e.g.
+#			<ul>
+#			<li><a href="https://developer.mozilla.org/en-US/docs/Web/Security/HTTP_strict_transport_security">HTTP Strict Transport Security</a></li>
+#			<li><a href="http://www.thoughtcrime.org/software/sslstrip/">sslstrip</a></li>
+#			<li><a href="https://hstspreload.appspot.com/">HSTS Preload Form</a></li>
+#			</ul>
+#		e.g.
+#			<ul><li><a target="_blank" href='https://developer.mozilla.org/en-US/docs/Web/HTTP/X-Frame-Options'>X-Frame-Options</a></li></ul>
+#
+#		every instance of a Burp issue type has the same block, so results are kept in a bounded LRU cache keyed by the block
+#		(like normalize_text); the urls and display texts are interned and the result is a tuple, so it cannot be modified by the caller
+#
+#		parameters:
+#			html_string - something that looks like the examples above (None == no anchors)
+#
+#		returns:
+#			(("<<url_0>>", "<<displaytext_0>>"), ..., ("<<url_n>>", "<<displaytext_n>>"))
+#
+#
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def extract_atags(html_string):
+	if html_string == None:
+		return ()
+	atags = []
+	for match in ATAG_PATTERN.finditer(html_string):
+		url = match.group(1)
+		if url == None:
+			url = match.group(2)
+		if url == None:
+			url = match.group(3)
+		atags.append((sys.intern(url.strip()), sys.intern(match.group(4).strip())))
+	return tuple(atags)
+
+
+#
+#
+#	parse_atags_in_html_string
+#
+#		extract_atags in the original (list of dicts) form
+#
+#		returns:
+#			[{'url':"<<url_0>>", 'displaytext':"<<displaytext_0>>"}, ..., {'url':"<<url_n>>", 'displaytext':"<<displaytext_n>>"}]
+#
+#
+def parse_atags_in_html_string(html_string):
+	return [{'url':url, 'displaytext':displaytext} for url,displaytext in extract_atags(html_string=html_string)]
+
+
+#
+#
+#	iterate_burp_issues
+#
+#		yield the top-level <issue> elements of a Burp xml file one at a time
+#
+#		the root burpVersion attribute is checked before any issue is yielded; if it is missing then a warning is printed and nothing is yielded
+#
+#		parameters:
+#			file - Burp file input (see open_burp_input), or a binary file-like object
+#			stream - False: ET.parse the whole file and then walk the issues (the original behavior)
+#					 True: use ET.iterparse so each <issue> is handed over as soon as its closing tag is read
+#						after the caller is done with an issue it is cleared and removed from the root, so peak memory stays flat no matter how big the file is
+#			parser - one of PARSER_BACKENDS; with 'lxml' the same is done with lxml.etree (parse/iterparse) in recover mode:
+#						a malformed or truncated file yields every issue that could be read instead of failing as a whole
+#						note: only the whole-file parse (stream == False) recovers past damage; lxml's iterparse stops at the
+#						first damaged element even in recover mode, so with stream == True the issues before it are all that is yielded
+#
+#
+def iterate_burp_issues(file, stream=False, parser='etree'):
+	source_context = contextlib.nullcontext(file) if hasattr(file, 'read') else open_burp_input(file)
+	file_name = getattr(file, 'name', file)
+	with source_context as source:
+		if stream == False:
+			#
+			#	Get XML tree/root
+			if parser == 'lxml':
+				tree = lxml.etree.parse(source, lxml.etree.XMLParser(huge_tree=True, recover=True, resolve_entities=False, no_network=True))
+			else:
+				tree = ET.parse(source)
+			root = tree.getroot()
+			#
+			#	"maximum effort" to verify this is actually a Burp xml file
+			#		- Deadpool
+			burp_version = None
+			if not root == None:
+				burp_version = root.get('burpVersion')
+			if (burp_version == None or burp_version == ""):
+				print("Warning: parse_files: the file \"" + str(file_name) + "\" does not appear to be a Burp xml issue export file")
+				return
+			for issue in root.findall('issue'):
+				yield issue
+		else:
+			root = None
+			depth = 0
+			if parser == 'lxml':
+				events = lxml.etree.iterparse(source, events=('start', 'end'), huge_tree=True, recover=True, resolve_entities=False, no_network=True)
+			else:
+				events = ET.iterparse(source, events=('start', 'end'))
+			for event, element in events:
+				if event == 'start':
+					if root == None:
+						root = element
+						burp_version = root.get('burpVersion')
+						if (burp_version == None or burp_version == ""):
+							print("Warning: parse_files: the file \"" + str(file_name) + "\" does not appear to be a Burp xml issue export file")
+							return
+					depth += 1
+				else:
+					depth -= 1
+					#
+					#	depth 1 means this element is a direct child of the root (i.e. an <issue>)
+					#	once the caller is finished with it, drop it so the tree never grows past a single issue
+					if depth == 1:
+						if element.tag == 'issue':
+							yield element
+						element.clear()
+						root.remove(element)
+
+
+#
+#
+#	normalize_text
+#
+#		unicode normalization, spacing fixes and markup removal for an issue text field
+#
+#		results are kept in a bounded LRU cache keyed by the raw text, since every instance of the same Burp issue type has
+#		byte-for-byte the same background/remediation text
+#
+#
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_text(contents):
+	contents = unicodedata.normalize("NFKD", contents)
+	contents = make_me_pretty.fix_spacing_issues(contents=contents)
+	contents = make_me_pretty.remove_lxml_markup(contents=contents)
+	return contents
+
+
+#
+#
+#	reference_urls
+#
+#		just the URLs (not the display text) from a references or vulnerabilityClassifications block (see extract_atags)
+#		cached the same way as normalize_text; returns a tuple so the cached value cannot be modified by the caller
+#
+#
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def reference_urls(html_string):
+	return tuple(url for url,displaytext in extract_atags(html_string=html_string))
+
+
+#
+#
+#	normalization_cache_counts
+#
+#		returns:
+#			{'normalize_text':{'hits':<<hits>>, 'misses':<<misses>>}, 'reference_urls':{...}}
+#			counts for this process plus whatever worker processes reported back (see worker_task)
+#
+#
+def normalization_cache_counts(include_workers=True):
+	retval = {}
+	for cached_function in [normalize_text, extract_atags, reference_urls]:
+		cache_info = cached_function.cache_info()
+		retval[cached_function.__name__] = {'hits':cache_info.hits, 'misses':cache_info.misses}
+		if (include_workers == True and cached_function.__name__ in WORKER_CACHE_COUNTS.keys()):
+			for key in retval[cached_function.__name__].keys():
+				retval[cached_function.__name__][key] += WORKER_CACHE_COUNTS[cached_function.__name__][key]
+	return retval
+
+
+#
+#
+#	worker_task
+#
+#		wrapper for the functions that parse_files runs in worker processes
+#		returns the function's result along with the cache hits/misses the task added in that worker, so the counts can be
+#		added up in the parent process with add_worker_cache_counts
+#
+#		returns:
+#			(result, cache_counts)
+#
+#
+def worker_task(function, kwargs):
+	if stopwatch.ENABLED == True:
+		stopwatch.reset()
+	counts_before = normalization_cache_counts(include_workers=False)
+	duplicates_before = DUPLICATE_COUNTS['removed']
+	result = function(**kwargs)
+	counts_after = normalization_cache_counts(include_workers=False)
+	cache_counts = {}
+	for name in counts_after.keys():
+		cache_counts[name] = {}
+		for key in counts_after[name].keys():
+			cache_counts[name][key] = counts_after[name][key] - counts_before[name][key]
+	#	the duplicates this task skipped are reported back the same way
+	cache_counts['duplicates'] = {'removed':DUPLICATE_COUNTS['removed'] - duplicates_before}
+	#	and so are this task's stage timings and counters, when profiling
+	if stopwatch.ENABLED == True:
+		cache_counts['profile'] = stopwatch.snapshot()
+	return (result, cache_counts)
+
+
+def add_worker_cache_counts(cache_counts):
+	for name in cache_counts.keys():
+		if name == 'duplicates':
+			DUPLICATE_COUNTS['removed'] += cache_counts[name]['removed']
+			continue
+		if name == 'profile':
+			stopwatch.merge(stopwatch_snapshot=cache_counts[name])
+			continue
+		if not name in WORKER_CACHE_COUNTS.keys():
+			WORKER_CACHE_COUNTS[name] = {'hits':0, 'misses':0}
+		for key in cache_counts[name].keys():
+			WORKER_CACHE_COUNTS[name][key] += cache_counts[name][key]
+
+
+#
+#
+#	enable_profiling
+#
+#		turn on stopwatch profiling and wrap the PROFILE_FUNCTIONS / PROFILE_TEXT_FUNCTIONS
+#		also used as the worker process initializer, so the workers time the same stages (and report them back with worker_task)
+#
+#
+def enable_profiling():
+	stopwatch.enable()
+	modules = {'breathmint':sys.modules[__name__], 'excelsify':excelsify, 'exportify':exportify, 'make_me_pretty':make_me_pretty, 'mint_tin':mint_tin}
+	for module_name,function_names in PROFILE_FUNCTIONS.items():
+		stopwatch.instrument(module=modules[module_name], module_name=module_name, function_names=function_names)
+	for module_name,function_names in PROFILE_TEXT_FUNCTIONS.items():
+		stopwatch.instrument(module=modules[module_name], module_name=module_name, function_names=function_names, measure_text=True)
+
+
+#
+#
+#	parse_cache_key
+#
+#		name of the parse cache entry for a file
+#
+#		the key covers the parser version, the file's absolute path, size, mtime and a sha256 of its contents, and the risk filters
+#		(they change which issues are kept) and the XML parser backend; a change to any of them means a cache miss
+#		for a zip member the size, mtime and contents are those of the zip file; standard input cannot be cached
+#
+#
+def parse_cache_key(file, risk_excluded=[], risk_included=[], dedupe=None, evidence_dir=None, parser='etree'):
+	disk_file = zip_member(file)[0]
+	file_stat = os.stat(disk_file)
+	content_hash = hashlib.sha256()
+	with open(disk_file, 'rb') as f:
+		for chunk in iter(lambda: f.read(PARSE_CACHE_HASH_CHUNK_SIZE), b''):
+			content_hash.update(chunk)
+	key_material = repr((PARSE_CACHE_VERSION, input_source_name(file), file_stat.st_size, file_stat.st_mtime_ns, content_hash.hexdigest(), sorted(risk_excluded), sorted(risk_included), dedupe, (None if evidence_dir == None else os.path.abspath(evidence_dir)), parser))
+	return "v" + PARSE_CACHE_VERSION + "-" + hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+
+#
+#
+#	load_parse_cache
+#
+#		returns:
+#			list of issues stored under cache_key, or None on a cache miss (or an unreadable entry)
+#			the issues go through share_issue_values, the same as freshly parsed ones
+#
+#
+def load_parse_cache(cache_dir, cache_key):
+	retval = None
+	try:
+		cache_path = os.path.join(cache_dir, cache_key + ".pickle")
+		if os.path.isfile(cache_path):
+			with open(cache_path, 'rb') as f:
+				entry = pickle.load(f)
+			if entry['version'] == PARSE_CACHE_VERSION:
+				retval = [share_issue_values(issue=Issue.from_record(record)) for record in entry['issues']]
+				for issue,identity in zip(retval, entry['identities']):
+					issue.identity = identity
+				#	the duplicates skipped while parsing the file are counted as if it had just been parsed
+				DUPLICATE_COUNTS['removed'] += entry['duplicates_removed']
+				#	mark the entry as recently used for prune_parse_cache
+				os.utime(cache_path)
+	except Exception as e:
+		print('\n==== Exception ====\n  breathmint.load_parse_cache()\n----')
+		print(e)
+		traceback.print_exc()
+		print('\n===================')
+		retval = None
+	return retval
+
+
+#
+#
+#	store_parse_cache
+#
+#		write the parsed issues of a file to the cache
+#		the entry is written to a temporary file first and then renamed, so readers (and other workers) never see a partial entry
+#
+#
+def store_parse_cache(cache_dir, cache_key, file, issues, duplicates_removed=0):
+	try:
+		os.makedirs(cache_dir, exist_ok=True)
+		cache_path = os.path.join(cache_dir, cache_key + ".pickle")
+		temp_path = cache_path + "." + str(os.getpid()) + ".tmp"
+		entry = {'version':PARSE_CACHE_VERSION, 'file':input_source_name(file), 'issues':[issue.to_record() for issue in issues], 'identities':[issue.identity for issue in issues], 'duplicates_removed':duplicates_removed}
+		with open(temp_path, 'wb') as f:
+			pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(temp_path, cache_path)
+	except Exception as e:
+		print('\n==== Exception ====\n  breathmint.store_parse_cache()\n----')
+		print(e)
+		traceback.print_exc()
+		print('\n===================')
+
+
+#
+#
+#	prune_parse_cache
+#
+#		remove cache entries that were not used in the last max_age_days days, entries written by another parser version and
+#		leftover temporary files
+#
+#		returns:
+#			number of files removed
+#
+#
+def prune_parse_cache(cache_dir, max_age_days):
+	removed = 0
+	try:
+		oldest_allowed = time.time() - (max_age_days * 24 * 60 * 60)
+		for entry in os.scandir(cache_dir):
+			if not entry.is_file():
+				continue
+			if entry.name.endswith(".tmp"):
+				stale = True
+			elif entry.name.endswith(".pickle"):
+				stale = (not entry.name.startswith("v" + PARSE_CACHE_VERSION + "-") or entry.stat().st_mtime < oldest_allowed)
+			else:
+				stale = False
+			if stale == True:
+				os.remove(entry.path)
+				removed += 1
+	except Exception as e:
+		print('\n==== Exception ====\n  breathmint.prune_parse_cache()\n----')
+		print(e)
+		traceback.print_exc()
+		print('\n===================')
+	return removed
+
+
+#
+#
+#	ByteRangeReader
+#
+#		read-only, file-like view over a list of (start, end) byte ranges of a memory-mapped file
+#		the ranges are read back to back, which lets ET parse a slice of a Burp file (header + some issues + footer) without copying it
+#
+#
+class ByteRangeReader:
+	def __init__(self, mapped, byte_ranges):
+		self.mapped = mapped
+		self.byte_ranges = list(byte_ranges)
+
+	def read(self, size=-1):
+		chunks = []
+		while (len(self.byte_ranges) > 0 and not size == 0):
+			start, end = self.byte_ranges[0]
+			stop = end
+			if size > 0:
+				stop = min(end, start + size)
+				size -= stop - start
+			chunks.append(self.mapped[start:stop])
+			if stop == end:
+				self.byte_ranges.pop(0)
+			else:
+				self.byte_ranges[0] = (stop, end)
+		return b''.join(chunks)
+
+
+#
+#
+#	split_burp_file
+#
+#		split a Burp xml file into byte ranges that start at <issue> boundaries
+#
+#		each part is returned as the list of byte ranges that ByteRangeReader needs to see a complete, well-formed Burp document:
+#			[(0, header_end), (part_start, part_end), (footer_start, file_size)]
+#		where the header is everything before the first <issue> (xml declaration, doctype, <issues burpVersion=...>)
+#		and the footer is the closing root tag
+#
+#		note: the split points are found by searching for the literal '<issue>' tag, so a non-base64 request/response that
+#			contains that exact text could land a split point in the middle of an issue (the part would then fail to parse)
+#
+#		parameters:
+#			mapped - memory-mapped Burp file
+#			parts - number of parts wanted; fewer are returned when the file is too small to split that many ways
+#
+#		returns:
+#			list of parts, or [] if the file does not look like it can be split (not a Burp file, no issues, ...)
+#
+#
+def split_burp_file(mapped, parts):
+	retval = []
+	try:
+		header_end = mapped.find(ISSUE_OPEN_TAG)
+		footer_start = mapped.rfind(b'</')
+		if (header_end < 0 or footer_start < header_end):
+			return []
+		#
+		#	check the root burpVersion attribute using just the header
+		burp_version = header_burp_version(header=mapped[:header_end])
+		if (burp_version == None or burp_version == ""):
+			return []
+		split_points = [header_end]
+		part_size = (footer_start - header_end) // max(parts, 1)
+		for part_number in range(1, parts):
+			split_point = mapped.find(ISSUE_OPEN_TAG, max(header_end + part_number * part_size, split_points[-1] + 1), footer_start)
+			if split_point < 0:
+				break
+			split_points.append(split_point)
+		split_points.append(footer_start)
+		for i in range(len(split_points) - 1):
+			retval.append([(0, header_end), (split_points[i], split_points[i+1]), (footer_start, len(mapped))])
+	except Exception as e:
+		print('\n==== Exception ====\n  breathmint.split_burp_file()\n----')
+		print(e)
+		traceback.print_exc()
+		print('\n===================')
+		retval = []
+	return retval
+
+
+#
+#
+#	Issue
+#
+#		one parsed Burp issue
+#
+#		a slotted record instead of a 20 key dictionary per issue (the keys are not repeated in every record), that can still be read
+#		like the old dictionary: issue['Vulnerability Name'], issue.keys(), issue.items(), dict(issue), ...
+#		see ISSUE_FIELDS for the keys and attribute names
+#
+#		request/response pairs are kept as a list of (request, response) tuples and only turned into the old
+#			{'0':{'request':..., 'response':...}, ...} dictionary when 'Request Response' is read
+#
+#
+class Issue(collections.abc.Mapping):
+	#	identity is not an issue field; it is the key used to find duplicates (see issue_identity), None when not deduplicating
+	__slots__ = [attribute for name,attribute in ISSUE_FIELDS] + ['identity']
+
+	def __init__(self, **attributes):
+		for name,attribute in ISSUE_FIELDS:
+			setattr(self, attribute, attributes.get(attribute, ""))
+		self.identity = None
+
+	def __getitem__(self, key):
+		value = getattr(self, ISSUE_ATTRIBUTES[key])
+		if key == 'Request Response':
+			request_response = {}
+			for i in range(len(value)):
+				request_response[str(i)] = {}
+				if not value[i][0] == None:
+					request_response[str(i)]['request'] = value[i][0]
+				if not value[i][1] == None:
+					request_response[str(i)]['response'] = value[i][1]
+			return request_response
+		return value
+
+	def __setitem__(self, key, value):
+		if key == 'Request Response':
+			value = [(pair.get('request'), pair.get('response')) for pair in value.values()]
+		setattr(self, ISSUE_ATTRIBUTES[key], value)
+
+	def __contains__(self, key):
+		return key in ISSUE_ATTRIBUTES
+
+	def __iter__(self):
+		for name,attribute in ISSUE_FIELDS:
+			yield name
+
+	def __len__(self):
+		return len(ISSUE_FIELDS)
+
+	def __repr__(self):
+		return "Issue(" + repr(dict(self)) + ")"
+
+	#
+	#	plain tuple of the attribute values (in ISSUE_FIELDS order) for storing an issue outside of this process
+	def to_record(self):
+		return tuple(getattr(self, attribute) for name,attribute in ISSUE_FIELDS)
+
+	@classmethod
+	def from_record(cls, record):
+		return cls(**dict(zip([attribute for name,attribute in ISSUE_FIELDS], record)))
+
+
 #
-# -- import private modules --
 #
+#	share_issue_values
 #
-import excelsify
-import make_me_pretty
+#		point the SHARED_ISSUE_ATTRIBUTES of an issue at the one shared copy of each distinct value in SHARED_VALUES
+#		lists become tuples so the shared value cannot be changed through one issue
+#		this keeps memory for the repeated text in line with the number of distinct issue types instead of the number of issues
+#
+#		returns:
+#			issue
+#
+#
+def share_issue_values(issue):
+	for attribute in SHARED_ISSUE_ATTRIBUTES:
+		value = getattr(issue, attribute)
+		if isinstance(value, list):
+			value = tuple(value)
+		setattr(issue, attribute, SHARED_VALUES.setdefault(value, value))
+	return issue
+
 
 #
 #
-# -- Global variables --
+#	severity_risk
 #
+#		returns:
+#			(severity, risk) of a <severity> element (None == no element); risk is the severity mapped through RISK_SYNONYM_MAPPING
 #
-RISK_VALUES = ["Critical", "High", "Medium", "Low", "Informational"]
-RISK_SYNONYM_MAPPING = {'None':"Informational", 'Info':"Informational", 'Information':"Informational", 'Moderate':"Medium"}
-SORT_ORDER_RISK = {"Critical":0, "High":1, "Medium":2, "Low":3, "Informational":4}
+#
+def severity_risk(severity_element):
+	severity = ""
+	risk = ""
+	if not severity_element == None:
+		severity = severity_element.text
+		risk = severity
+		if risk in RISK_SYNONYM_MAPPING.keys():
+			risk = RISK_SYNONYM_MAPPING[risk]
+	return (severity, risk)
+
 
 #
 #
-# -- Function declarations --
+#	issue_risk
+#
+#		returns:
+#			(severity, risk) of an <issue> element; see severity_risk
 #
 #
+def issue_risk(issue):
+	return severity_risk(severity_element=issue.find('severity'))
+
 
 #
 #
-#	breathmint_logo
+#	extract_issue_fields
 #
-#		tis a silly little function to return a logo as a string
+#		one pass over the children of an <issue> element, running the ISSUE_TAG_FIELDS extractors of each mapped tag
+#		only the first child with a given tag is used (the same element issue.find(tag) would return)
 #
+#		returns:
+#			{'<<field name>>':<<extracted value>>, ...} for the mapped tags found in the issue; missing tags have no entry
 #
-def breathmint_logo():
-	try:
-		retval = ""
-		retval = retval + "                              /||-----||/\n"
-		retval = retval + "                            |-------------|/\n"
-		retval = retval + "                           -----------------|\n"
-		retval = retval + "                          |------------------/\n"
-		retval = retval + "                          //////////|--------|\n"
-		retval = retval + ".......--------------------------------------|      ////\n"
-		retval = retval + "_......-------------------------------------/  /||--------||\n"
-		retval = retval + "-......------------------------------------/  |--------------|\n"
-		retval = retval + "/......----------------------------------/   ------------------\n"
-		retval = retval + " --------------------------||||||||||||/    |------------------|\n"
-		retval = retval + "  ___________________________________________//////////|-------|\n"
-		retval = retval + "  /........----------------------------------------------------|\n"
-		retval = retval + "   /.......----------------------------------------------------/\n"
-		retval = retval + "    /_.....--------------------------------------------------/\n"
-		retval = retval + "      -....------------------------------------------------|/\n"
-		retval = retval + "       --------------------------------------------------//\n"
-		retval = retval + "          ______________________________________\n"
-		retval = retval + "           /-..._________------------------------|\n"
-		retval = retval + "              |-_________--------------------------/\n"
-		retval = retval + "                 /|-_____---------------------------/\n"
-		retval = retval + "                      /||---------------------------|\n"
-		retval = retval + "                                 //////////|--------|\n"
-		retval = retval + "                                 |------------------/\n"
-		retval = retval + "                                  -----------------|\n"
-		retval = retval + "                                   |-------------|/\n"
-		retval = retval + "                                     /||-----||/\n"
-		retval = retval + "\n\nby FYRM Associates\n"
-		return retval
-	except Exception as e:
-		print('\n==== Exception ====\n  breathmint.breathmintLogo()\n----')
-		print(e)
-		traceback.print_exc()
-		print('\n===================')
-		print('(this is really embarrassing)')
-		return 'breathmint'
+#
+def extract_issue_fields(issue):
+	fields = {}
+	found_tags = set()
+	for child in issue:
+		extractors = ISSUE_TAG_FIELDS.get(child.tag)
+		if (not extractors == None and not child.tag in found_tags):
+			found_tags.add(child.tag)
+			for field_name,extractor in extractors:
+				fields[field_name] = extractor(child)
+	return fields
 
 
 #
 #
-#	find_burp_output
+#	risk_is_reported
 #
-#		find all Burp output files in the given directory
+#		returns:
+#			True if issues with this risk make it past risk_excluded/risk_included (see parse_files)
 #
 #
-def find_burp_output(directory):
-	try:
-		files = []
-		for file in os.listdir(directory):
-			if (file.endswith(".xml") and not file.startswith("~$")):
-				print('Found ' + file)
-				files.append(file)
+def risk_is_reported(risk, risk_excluded=[], risk_included=[]):
+	if risk in risk_excluded:
+		return False
+	elif (not risk_included == [] and not risk in risk_included):
+		return False
+	return True
+
+
+#
+#
+#	issue_identity
+#
+#		the key used to find duplicate issues, taken from the raw <issue> element (before any normalization work)
+#
+#		parameters:
+#			issue - <issue> element
+#			dedupe - 'serial': the serialNumber (issues without one fall back to 'content')
+#					 'content': a hash of the name, host (URI), path, location and issueDetail text
+#
+#		returns:
+#			"<<serialNumber>>" | b"<<16 byte hash>>"
+#
+#
+def issue_identity(issue, dedupe):
+	if dedupe == 'serial':
+		serial_number = issue.findtext('serialNumber')
+		if not (serial_number == None or serial_number == ""):
+			return serial_number
+	content_hash = hashlib.blake2b(digest_size=16)
+	for tag in DEDUPE_CONTENT_TAGS:
+		text = issue.findtext(tag)
+		if text == None:
+			text = ""
+		content_hash.update(text.encode('utf-8', 'surrogatepass') + b'\0')
+	return content_hash.digest()
+
+
+#
+#
+#	store_evidence
+#
+#		write one request or response body to the content-addressed evidence store and return its path
+#		the file is named after the sha256 of the (decoded) body, <<evidence_dir>>/<<first 2 hex digits>>/<<sha256>>, so a body that
+#		shows up in many issues is stored once; bodies already in the store are not written again
+#		each body is written to a temporary file first and renamed into place, so worker processes can share the store
+#
+#		parameters:
+#			evidence_dir - evidence store directory
+#			text - <request>/<response> element text (None for an empty element)
+#			is_base64 - True if text is base64 (Burp's base64="true"); it is decoded before it is stored
+#
+#		returns:
+#			path of the evidence file
+#
+#
+def store_evidence(evidence_dir, text, is_base64):
+	if text == None:
+		text = ""
+	content = None
+	if is_base64 == True:
+		try:
+			content = base64.b64decode(text)
+		except ValueError:
+			content = None
+	if content == None:
+		content = text.encode('utf-8', 'surrogateescape')
+	digest = hashlib.sha256(content).hexdigest()
+	evidence_subdir = os.path.join(evidence_dir, digest[:2])
+	evidence_path = os.path.join(evidence_subdir, digest)
+	if not os.path.isfile(evidence_path):
+		os.makedirs(evidence_subdir, exist_ok=True)
+		temp_fd, temp_path = tempfile.mkstemp(dir=evidence_subdir, prefix="." + digest + ".")
+		try:
+			with os.fdopen(temp_fd, 'wb') as f:
+				f.write(content)
+			os.replace(temp_path, evidence_path)
+		except BaseException:
+			if os.path.exists(temp_path):
+				os.remove(temp_path)
+			raise
+	return evidence_path
+
+
+#
+#
+#	parse_issue
+#
+#		parse a single Burp <issue> element into a breathmint issue dictionary
+#
+#		exceptions are left for parse_files to catch so that a broken file is reported and skipped as a whole
+#
+#		parameters:
+#			issue - <issue> element
+#			issue_count - number of issues already kept from this file; used as the serial number when the issue does not have one
+#			risk_excluded - see parse_files
+#			risk_included - see parse_files
+#			evidence_dir - see parse_files; when set, 'Request Response' holds evidence file paths instead of base64 text
+#
+#		returns:
+#			Issue - see the comment in the __main__ function for details
+#			None if the issue was filtered out by risk_excluded/risk_included
+#
+#
+def parse_issue(issue, issue_count, risk_excluded=[], risk_included=[], evidence_dir=None):
+	fields = extract_issue_fields(issue=issue)
+	#
+	#	Generic issue data mapping (breathmint <-> burp.xml):
+	#		serial_number <-> serialNumber
+	#		background <-> issueBackground
+	#		remediation <-> remediationBackground
+	#		references <-> references
+	#		classification <-> vulnerabilityClassifications
+	#
+	serial_number = fields.get('serial_number', str(issue_count))
+	name = fields['name']
+	background = fields.get('background', "")
+	remediation = fields.get('remediation', "")
+	remediation_detail = fields.get('remediation_detail')
+	if (not remediation_detail == None and not remediation_detail == ""):
+		remediation_detail = normalize_text(contents=remediation_detail)
+		if (not remediation_detail == "" and not remediation_detail == "Enter Remediation Detail..."):
+			remediation += "\n" + remediation_detail
+	references = fields.get('references', [])
+	classification = fields.get('classification', [])
+	#
+	#	Modifiable issue data mapping (breathmint <-> burp.xml):
+	#		severity <-> severity
+	#		confidence <-> confidence
+	#
+	severity, risk = fields.get('severity_risk', ("", ""))
+	if not risk in SORT_ORDER_RISK.keys():
+		print("ERROR: unexpected risk (" + risk + ")")
+	if risk_is_reported(risk=risk, risk_excluded=risk_excluded, risk_included=risk_included) == False:
+		return None
+	else:
+		confidence = fields.get('confidence', "")
+		#
+		#	Target data mapping (breathmint <-> burp.xml):
+		#		ip <-> host ip
+		#		uri <-> host
+		#		port <-> None (port is determined using uri value)
+		#		path <-> path
+		#		location <-> location
+		#
+		#	note: ip and uri is in the <host> tag with the following format:
+		#			<host ip="10.1.2.3">https://www.example.org</host>
+		#
+		ip = fields.get('ip') or ""
+		uri = fields.get('uri') or ""
+		fqdn = ""
+		port = "443"
+		protocol = "https"
+		uri_split = uri.split(':')
+		if len(uri_split) == 3:
+			fqdn = re.sub(r'//', '', uri_split[1])
+			port = uri_split[2]
+		elif len(uri_split) == 2:
+			fqdn = re.sub(r'//', '', uri_split[1])
+			if uri_split[0] == "http":
+				port = "80"
+				protocol = "http"
+			elif uri_split[0] == "https":
+				port = "443"
 			else:
+				print("TODO: add default port number assignment to the code; protocol observed:", uri_split[0])
+		path = fields.get('path', "")
+		location = fields.get('location', "")
+		#
+		#	sometimes burp results put the same value in path and location, in which case it seems like location is really just the path
+		if location == path:
+			location = ""
+		#
+		#	Additional details data mapping (breathmint <-> burp.xml):
+		#		target_details <-> issueDetailItems
+		#		issue_details <-> issueDetail
+		#		issue_details <-> issueDetailItems (list with all issueDetail text)
+		#		requestresponse <-> requestresponse
+		#
+		target_details = fields.get('issue_detail_items', [])
+		issue_details = ""
+		if 'issue_detail' in fields:
+			issue_details = fields['issue_detail']
+			issue_details = unicodedata.normalize("NFKD", issue_details)
+			issue_details = re.sub('&nbsp;', '', issue_details)
+			issue_details = make_me_pretty.fix_spacing_issues(contents=issue_details)
+			issue_details = make_me_pretty.remove_lxml_markup(contents=issue_details)
+			for item_detail in target_details:
+				new_detail = unicodedata.normalize("NFKD", item_detail)
+				new_detail = make_me_pretty.fix_spacing_issues(contents=new_detail)
+				new_detail = make_me_pretty.remove_lxml_markup(contents=new_detail)
+				issue_details += "\n" + new_detail
+		#
+		#	some burp extensions do not populate the background, remediation, and other fields properly
+		#		and instead throw everything into 'issueDetail'
+		#
+		if background == "":
+			background = issue_details
+		requests = []
+		responses = []
+		if 'request_response' in fields:
+			for element_list,tag in [(requests, 'request'), (responses, 'response')]:
+				for element in fields['request_response'].iter(tag):
+					if not evidence_dir == None:
+						element_list.append(store_evidence(evidence_dir=evidence_dir, text=element.text, is_base64=(element.get('base64') == "true")))
+					elif element.get('base64') == "true":
+						element_list.append(element.text)
+					else:
+						element_list.append(base64.b64encode((element.text or "").encode('utf-8', 'ignore')).decode('ascii'))
+		request_response = []
+		for i in range(max(len(requests), len(responses))):
+			request_response.append((requests[i] if i < len(requests) else None, responses[i] if i < len(responses) else None))
+		#
+		#	now that we have all the data, return it; Issue can be read with the user-friendly field names as keys
+		#	Product Name: might be fun to determine a product name for common apps, but that is for another day
+		#		just a placeholder for now
+		return share_issue_values(issue=Issue(serial_number=serial_number, name=name, background=background, product_name="", remediation=remediation, references=references, classification=classification, risk=risk, severity=severity, confidence=confidence, ip=ip, uri=uri, fqdn=fqdn, port=port, protocol=protocol, path=path, location=location, target_details=target_details, issue_details=issue_details, request_response=request_response))
+
+
+#
+#
+#	parse_issue_elements
+#
+#		parse the <issue> elements of one file (or file part) in order, skipping duplicates before any normalization work
+#
+#		parameters:
+#			issues - iterable of <issue> elements (see iterate_burp_issues)
+#			risk_excluded - see parse_files
+#			risk_included - see parse_files
+#			dedupe - see parse_files (None == keep duplicates)
+#			known_identities - identities of the issues parse_files already kept from earlier files (read only; None == unknown)
+#				matching issues are skipped without being parsed, but still count towards the serial number fallback, exactly as
+#				if they had been parsed here and dropped later by parse_files; that way the numbering does not depend on
+#				whether a duplicate was caught here or in parse_files
+#			recover - True (lxml recover mode) to report and skip an issue that cannot be parsed (e.g. one the XML parser only
+#				partly recovered) and carry on with the next one; False lets the exception through to the caller
+#
+#		yields:
+#			(issue, has_serial_number) for each issue kept, with issue.identity set
+#
+#
+def parse_issue_elements(issues, risk_excluded=[], risk_included=[], dedupe=None, known_identities=None, evidence_dir=None, recover=False):
+	issue_count = 0
+	kept_identities = set()
+	for issue in issues:
+		identity = None
+		if not dedupe == None:
+			identity = issue_identity(issue=issue, dedupe=dedupe)
+			#
+			#	only duplicates that would otherwise have been reported are counted (the risk filters drop the rest anyway)
+			if identity in kept_identities:
+				if risk_is_reported(risk=issue_risk(issue=issue)[1], risk_excluded=risk_excluded, risk_included=risk_included) == True:
+					DUPLICATE_COUNTS['removed'] += 1
+				continue
+			if (not known_identities == None and identity in known_identities):
+				if risk_is_reported(risk=issue_risk(issue=issue)[1], risk_excluded=risk_excluded, risk_included=risk_included) == True:
+					DUPLICATE_COUNTS['removed'] += 1
+					kept_identities.add(identity)
+					issue_count += 1
 				continue
-		return files
+		if recover == True:
+			try:
+				new_issue = parse_issue(issue=issue, issue_count=issue_count, risk_excluded=risk_excluded, risk_included=risk_included, evidence_dir=evidence_dir)
+			except Exception as e:
+				print("Warning: parse_files: skipped a damaged issue (serialNumber: " + str(issue.findtext('serialNumber')) + ", name: " + str(issue.findtext('name')) + "): " + repr(e))
+				continue
+		else:
+			new_issue = parse_issue(issue=issue, issue_count=issue_count, risk_excluded=risk_excluded, risk_included=risk_included, evidence_dir=evidence_dir)
+		if not new_issue == None:
+			new_issue.identity = identity
+			if not identity == None:
+				kept_identities.add(identity)
+			yield (new_issue, not issue.find('serialNumber') == None)
+			issue_count += 1
+
+
+#
+#
+#	parse_file
+#
+#		parse a single Burp file
+#
+#		an exception thrown while parsing the file is reported here and the issues parsed up to that point are kept
+#		this is also the unit of work handed to each worker process when parse_files is run with jobs > 1
+#
+#		parameters:
+#			file - Burp xml file
+#			risk_excluded - see parse_files
+#			risk_included - see parse_files
+#			stream - see parse_files
+#			cache_dir - see parse_files
+#			dedupe - see parse_files
+#			parser - see parse_files
+#			known_identities - see parse_issue_elements; not used together with cache_dir, since the cached issues
+#				must not depend on which other files were parsed before this one
+#
+#		returns:
+#			list of issues found in the file, in file order (not sorted)
+#
+#
+def parse_file(file, risk_excluded=[], risk_included=[], stream=False, cache_dir=None, dedupe=None, known_identities=None, evidence_dir=None, parser='etree'):
+	file_issues = []
+	print("Parsing: " + str(file) + "\n...")
+	try:
+		cache_key = None
+		if (not cache_dir == None and not file == STDIN_INPUT):
+			cache_key = parse_cache_key(file=file, risk_excluded=risk_excluded, risk_included=risk_included, dedupe=dedupe, evidence_dir=evidence_dir, parser=parser)
+			cached_issues = load_parse_cache(cache_dir=cache_dir, cache_key=cache_key)
+			if not cached_issues == None:
+				print("Loaded from cache: " + str(file))
+				print("Finished: " + str(file))
+				return cached_issues
+			known_identities = None
+		duplicates_before = DUPLICATE_COUNTS['removed']
+		with open_burp_input(file) as source:
+			for new_issue,has_serial_number in parse_issue_elements(issues=iterate_burp_issues(file=source, stream=stream, parser=parser), risk_excluded=risk_excluded, risk_included=risk_included, dedupe=dedupe, known_identities=known_identities, evidence_dir=evidence_dir, recover=(parser == 'lxml')):
+				file_issues.append(new_issue)
+			bytes_parsed = input_position(source)
+		if not bytes_parsed == None:
+			stopwatch.add_count(counter_name="xml bytes parsed", value=bytes_parsed)
+		stopwatch.add_count(counter_name="issues parsed", value=len(file_issues))
+		if not cache_key == None:
+			store_parse_cache(cache_dir=cache_dir, cache_key=cache_key, file=file, issues=file_issues, duplicates_removed=DUPLICATE_COUNTS['removed'] - duplicates_before)
 	except Exception as e:
-		print('\n==== Exception ====\n  breathmint.find_burp_output()\n----')
+		print("===================")
+		print("\nERROR: breathmint.parse_files: Exception thrown when parsing file: ", str(file))
 		print(e)
 		traceback.print_exc()
+		print("\n\t  moving on to next file")
 		print("===================")
-		return []
+	print("Finished: " + str(file))
+	return file_issues
 
 
 #
 #
-#	parse_atags_in_html_string
-#
-#		get the url and displaytext from the html string
-#		useful for the references and classification content in Burp XML output
+#	parse_file_part
 #
-#		the references item is a single string containing HTML tags: <ul>, <li>, <a>
-#		e.g.
-#			<ul>
-#			<li><a href="https://developer.mozilla.org/en-US/docs/Web/Security/HTTP_strict_transport_security">HTTP Strict Transport Security</a></li>
-#			<li><a href="http://www.thoughtcrime.org/software/sslstrip/">sslstrip</a></li>
-#			<li><a href="https://hstspreload.appspot.com/">HSTS Preload Form</a></li>
-#			</ul>
-#		e.g.
-#			<ul><li><a href="https://developer.mozilla.org/en-US/docs/Web/HTTP/X-Frame-Options">X-Frame-Options</a></li></ul>
+#		parse one part of a Burp file that was split with split_burp_file
+#		this is the unit of work handed to each worker process when parse_files is run with split_files=True
 #
 #		parameters:
-#			html_string - something that looks like the examples above
+#			file - Burp xml file
+#			byte_ranges - one of the parts returned by split_burp_file
+#			risk_excluded - see parse_files
+#			risk_included - see parse_files
+#			stream - see parse_files
+#			dedupe - see parse_files; duplicates are only skipped within the part here, parse_files removes the rest
+#			parser - see parse_files
 #
 #		returns:
-#			[{'url':"<<url_0>>", 'displaytext':"<<displaytext_0>>"}, ..., {'url':"<<url_n>>", 'displaytext':"<<displaytext_n>>"}]
+#			(part_issues, fallback_serial_numbers, part_complete)
+#				part_issues - list of issues found in this part, in file order (not sorted)
+#				fallback_serial_numbers - indexes in part_issues of the issues that did not have a serialNumber
+#					their 'Serial Number' is numbered from 0 within this part and has to be offset by parse_files
+#				part_complete - False if parsing stopped early because of an exception
 #
 #
-def parse_atags_in_html_string(html_string):
-	retval = []
+def parse_file_part(file, byte_ranges, risk_excluded=[], risk_included=[], stream=False, dedupe=None, evidence_dir=None, parser='etree'):
+	part_issues = []
+	fallback_serial_numbers = []
+	part_complete = False
 	try:
-		html_string = html_string.strip()
-		#	remove both opening and closing HTML list tags (<ul>, </ul>, <li>, </li>)
-		html_string = re.sub(r'</*ul>', '', html_string)
-		html_string = re.sub(r'</*li>', '', html_string)
-		#	split at the </a> closing tags
-		html_string_list = html_string.split('</a>')
-		for each_reference in html_string_list:
-			each_reference = each_reference.strip()
-			if len(each_reference) > 0:
-				#	remove the <a part of opening tag including the href syntax
-				#	either single quote or double quote might be used so just remove both
-				#		there's a single regex that could do this, but i don't feel like searching stackoverflow for it
-				each_reference = re.sub(r'<a href="', '', each_reference)
-				each_reference = re.sub(r"<a href='", '', each_reference)
-				#	then split at the "> characters to separate the URL from the user-friendly link display text
-				url_displaytext_split = each_reference.split('">')
-				#	and in case '> was used instead of ">, do this:
-				if len(url_displaytext_split) == 1:
-					url_displaytext_split = each_reference.split("'>")
-				url = url_displaytext_split[0].strip()
-				displaytext = url_displaytext_split[1].strip()
-				retval.append({'url':url, 'displaytext':displaytext})
+		with open(file, 'rb') as f:
+			with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+				for new_issue,has_serial_number in parse_issue_elements(issues=iterate_burp_issues(file=ByteRangeReader(mapped=mapped, byte_ranges=byte_ranges), stream=stream, parser=parser), risk_excluded=risk_excluded, risk_included=risk_included, dedupe=dedupe, evidence_dir=evidence_dir, recover=(parser == 'lxml')):
+					if has_serial_number == False:
+						fallback_serial_numbers.append(len(part_issues))
+					part_issues.append(new_issue)
+		part_complete = True
+		stopwatch.add_count(counter_name="xml bytes parsed", value=byte_ranges[1][1] - byte_ranges[1][0])
+		stopwatch.add_count(counter_name="issues parsed", value=len(part_issues))
 	except Exception as e:
-		print('\n==== Exception ====\n  breathmint.parse_atags_in_html_string()\n----')
+		print("===================")
+		print("\nERROR: breathmint.parse_files: Exception thrown when parsing file: ", str(file), "(bytes " + str(byte_ranges[1][0]) + "-" + str(byte_ranges[1][1]) + ")")
 		print(e)
 		traceback.print_exc()
-		print('\n===================')
-	return retval
+		print("\n\t  moving on to next part")
+		print("===================")
+	return (part_issues, fallback_serial_numbers, part_complete)
+
+
+#
+#
+#	drop_duplicate_issues
+#
+#		the cross-file half of '--dedupe': keep the issues whose identity is not in seen_identities yet
+#		parse_files runs every file's issues through this, in file_list order, so the first occurrence of an issue always wins
+#
+#		parameters:
+#			issues - issues of one file, with issue.identity set (issues with identity None are always kept)
+#			seen_identities - identities of the issues kept so far; updated in place
+#
+#		yields:
+#			the issues kept (a generator, so issues can be run through it one at a time; see pipeline_producer)
+#
+#
+def drop_duplicate_issues(issues, seen_identities):
+	for issue in issues:
+		if not issue.identity == None:
+			if issue.identity in seen_identities:
+				DUPLICATE_COUNTS['removed'] += 1
+				continue
+			seen_identities.add(issue.identity)
+		yield issue
+
+
+#
+#
+#	store_file_issues
+#
+#		write the issues parsed from one Burp file to the issue database (see mint_tin), replacing what was stored for that file before
+#
+#
+def store_file_issues(connection, file, issues):
+	stored = mint_tin.store_issues(connection=connection, source_file=input_source_name(file), field_names=[attribute for name,attribute in ISSUE_FIELDS], records=[issue.to_record() for issue in issues], sort_order_risk=SORT_ORDER_RISK)
+	print("Stored in issue database: " + str(file) + " (" + str(stored) + " issues)")
+
+
+#
+#
+#	group_issues
+#
+#		merge the issues into one row per Vulnerability Name + Risk (for '--group' output)
+#		each group keeps the fields of its first issue and gets a 'Target' dict in the form excelsify.create_worksheet_data expects:
+#			{'<<risk>>':[{'Risk':"<<risk>>", 'FQDN':"<<fqdn>>", 'Protocol':"<<protocol>>", 'Port':"<<port>>", 'Path':"<<path>>"}, ...]}
+#		targets are deduplicated on (FQDN, Protocol, Port, Path) with a set, so grouping is one pass over the issues
+#
+#		parameters:
+#			issues - any iterable of issues (all_issues, or issues streamed from the issue database)
+#
+#		returns:
+#			list of grouped issue dictionaries, in order of each group's first issue
+#
+#
+def group_issues(issues):
+	groups = {}
+	group_target_keys = {}
+	for issue in issues:
+		group_key = (issue['Vulnerability Name'], issue['Risk'])
+		if not group_key in groups:
+			groups[group_key] = dict(issue)
+			groups[group_key]['Target'] = {issue['Risk']:[]}
+			group_target_keys[group_key] = set()
+		path = issue['Path']
+		if path == None:
+			path = ""
+		target_key = (issue['FQDN'], issue['Protocol'], issue['Port'], path)
+		if not target_key in group_target_keys[group_key]:
+			group_target_keys[group_key].add(target_key)
+			groups[group_key]['Target'][issue['Risk']].append({'Risk':issue['Risk'], 'FQDN':issue['FQDN'], 'Protocol':issue['Protocol'], 'Port':issue['Port'], 'Path':path})
+	return list(groups.values())
 
 
 #
@@ -194,231 +1599,348 @@ def parse_atags_in_html_string(html_string):
 #							will continue to next issue if the current issue has a matching risk value
 #			risk_included - specifically included risk ratings
 #							if empty list then all will be included
+#			stream - True to parse each file incrementally; see iterate_burp_issues
+#			jobs - number of worker processes; files are handed out one per task when > 1
+#					results are merged back in file_list order, so the output is identical to a serial run
+#			split_files - True to also split each file into (up to) jobs parts at <issue> boundaries and parse the parts in parallel
+#					useful when one huge file holds most of the issues; see split_burp_file
+#					if any part fails or stops early, that file's part results are dropped and the file is parsed again as a whole
+#			cache_dir - directory for the on-disk parse cache (None == no cache); see parse_cache_key
+#					files that have not changed since they were cached are loaded from the cache instead of being parsed again
+#			db_path - SQLite issue database (None == no database); the issues of each file are also written to it, see store_file_issues
+#			dedupe - None to keep every issue, or one of DEDUPE_MODES to drop duplicate issues (see issue_identity)
+#					duplicates within a file, and (serial run without cache/database) duplicates of issues kept from earlier files,
+#					are skipped before they are parsed; duplicates across files found by the workers are dropped while merging
+#					the cache and database keep each file's own issues (duplicates of other files included)
+#			evidence_dir - evidence store directory (None == keep the request/response text in the issues, base64 encoded)
+#					when set, every request/response body is written to the store (see store_evidence) as it is parsed and
+#					'Request Response' holds the evidence file paths, so issues stay small and a repeated body is stored once
+#			parser - XML parser backend, one of PARSER_BACKENDS (see iterate_burp_issues); both give the same issues for a
+#					well-formed file, 'lxml' is faster and (without stream) also reads what it can from a malformed or truncated one;
+#					a recovered issue that still cannot be parsed is reported and skipped (see parse_issue_elements)
 #
 #		returns:
 #			all_issues - see the comment in the __main__ function for details
 #
 #
-def parse_files(file_list, risk_excluded=[], risk_included=[]):
+def parse_files(file_list, risk_excluded=[], risk_included=[], stream=False, jobs=1, split_files=False, cache_dir=None, db_path=None, dedupe=None, evidence_dir=None, parser='etree'):
 	all_issues = []
+	db_connection = None
+	#	streaming hash index of the identities of the issues kept so far (see drop_duplicate_issues)
+	seen_identities = set()
 	try:
 		print("<< Parsing Burp files >>")
-		for file in file_list:
-			print("Parsing: " + str(file) + "\n...")
-			try:
-				#
-				#	Get XML tree/root
-				tree = ET.parse(file)
-				root = tree.getroot()
+		SHARED_VALUES.clear()
+		DUPLICATE_COUNTS['removed'] = 0
+		if not db_path == None:
+			db_connection = mint_tin.open_issue_store(db_path=db_path, field_names=[attribute for name,attribute in ISSUE_FIELDS], store_version=int(PARSE_CACHE_VERSION))
+			if db_connection == None:
+				print("ERROR: breathmint.parse_files: could not open the issue database; issues will not be stored:", db_path)
+		if (jobs == None or jobs <= 1 or (len(file_list) <= 1 and split_files == False)):
+			known_identities = None
+			if (not dedupe == None and cache_dir == None and db_connection == None):
+				known_identities = seen_identities
+			for file in file_list:
+				file_issues = parse_file(file=file, risk_excluded=risk_excluded, risk_included=risk_included, stream=stream, cache_dir=cache_dir, dedupe=dedupe, known_identities=known_identities, evidence_dir=evidence_dir, parser=parser)
+				if not db_connection == None:
+					store_file_issues(connection=db_connection, file=file, issues=file_issues)
+				all_issues.extend(drop_duplicate_issues(issues=file_issues, seen_identities=seen_identities))
+		else:
+			worker_initializer = None
+			if stopwatch.ENABLED == True:
+				worker_initializer = enable_profiling
+			with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=worker_initializer) as executor:
 				#
-				#	"maximum effort" to verify this is actually a Burp xml file
-				#		- Deadpool
-				try:
-					burp_version = root.get('burpVersion')
-					if (burp_version == None or burp_version == ""):
-						print("Warning: parse_files: the file \"" + str(file) + "\" does not appear to be a Burp xml issue export file")
-						continue
-				except:
-					print("Warning: parse_files: the file \"" + str(file) + "\" does not appear to be a Burp xml issue export file")
-					continue
-				issue_count = 0
-				for issue in root.findall('issue'):
-					#
-					#	Generic issue data mapping (breathmint <-> burp.xml):
-					#		serial_number <-> serialNumber
-					#		background <-> issueBackground
-					#		remediation <-> remediationBackground
-					#		references <-> references
-					#		classification <-> vulnerabilityClassifications
-					#
-					serial_number = str(issue_count)
-					if not issue.find('serialNumber') == None:
-						serial_number = issue.find('serialNumber').text
-					name = issue.find('name').text
-					background = ""
-					if not issue.find('issueBackground') == None:
-						background = issue.find('issueBackground').text
-						background = unicodedata.normalize("NFKD", background)
-						background = make_me_pretty.fix_spacing_issues(contents=background)
-						background = make_me_pretty.remove_lxml_markup(contents=background)
-					remediation = ""
-					if not issue.find('remediationBackground') == None:
-						remediation = issue.find('remediationBackground').text
-						remediation = unicodedata.normalize("NFKD", remediation)
-						remediation = make_me_pretty.fix_spacing_issues(contents=remediation)
-						remediation = make_me_pretty.remove_lxml_markup(contents=remediation)
-					if not issue.find('remediationDetail') == None:
-						remediation_detail = issue.find('remediationDetail').text
-						if (not remediation_detail == None and not remediation_detail == ""):
-							remediation_detail = unicodedata.normalize("NFKD", remediation_detail)
-							remediation_detail = make_me_pretty.fix_spacing_issues(contents=remediation_detail)
-							remediation_detail = make_me_pretty.remove_lxml_markup(contents=remediation_detail)
-							if (not remediation_detail == "" and not remediation_detail == "Enter Remediation Detail..."):
-								remediation += "\n" + remediation_detail
-					references = []
-					if not issue.find('references') == None:
-						parsed_atags = parse_atags_in_html_string(html_string=issue.find('references').text)
-						#	let's just keep the actual URLs, not the display text
-						for atag_dict in parsed_atags:
-							references.append(atag_dict['url'])
-					classification = []
-					if not issue.find('vulnerabilityClassifications') == None:
-						parsed_atags = parse_atags_in_html_string(html_string=issue.find('vulnerabilityClassifications').text)
-						#	let's just keep the actual URLs, not the display text
-						for atag_dict in parsed_atags:
-							classification.append(atag_dict['url'])
-					#
-					#	Modifiable issue data mapping (breathmint <-> burp.xml):
-					#		severity <-> severity
-					#		confidence <-> confidence
-					#
-					severity = ""
-					risk = ""
-					if not issue.find('severity') == None:
-						severity = issue.find('severity').text
-						risk = severity
-						if risk in RISK_SYNONYM_MAPPING.keys():
-							risk = RISK_SYNONYM_MAPPING[risk]
-					if not risk in SORT_ORDER_RISK.keys():
-						print("ERROR: unexpected risk (" + risk + ")")
-					if risk in risk_excluded:
-						continue
-					elif (not risk_included == [] and not risk in risk_included):
-						continue
+				#	tasks: [{'file':file, 'future':future_of_whole_file, 'part_futures':[futures_of_file_parts], 'cache_key':cache_key, 'parse_file_kwargs':{...}}, ...]
+				#		exactly one of future / part_futures is used per file (parse_file_kwargs is kept for split files, see below)
+				#		parse_file takes care of the cache itself; for split files it is checked and updated here
+				tasks = []
+				for file in file_list:
+					file_parts = []
+					cache_key = None
+					#	only an uncompressed file on disk can be memory-mapped and split; anything else is parsed as a whole
+					#		so is a file that cannot be split (empty, missing, unreadable, ...); parse_file then reports the problem
+					try:
+						if (split_files == True and plain_input(file) == True):
+							if not cache_dir == None:
+								cache_key = parse_cache_key(file=file, risk_excluded=risk_excluded, risk_included=risk_included, dedupe=dedupe, evidence_dir=evidence_dir, parser=parser)
+								cached_issues = load_parse_cache(cache_dir=cache_dir, cache_key=cache_key)
+								if not cached_issues == None:
+									print("Loaded from cache: " + str(file))
+									all_issues_future = concurrent.futures.Future()
+									all_issues_future.set_result((cached_issues, {}))
+									tasks.append({'file':file, 'future':all_issues_future, 'part_futures':[], 'cache_key':None})
+									continue
+							with open(file, 'rb') as f:
+								with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+									file_parts = split_burp_file(mapped=mapped, parts=jobs)
+					except Exception as e:
+						print("Warning: parse_files: could not split " + str(file) + " (" + str(e) + "); parsing it as a whole")
+						file_parts = []
+						cache_key = None
+					parse_file_kwargs = {'file':file, 'risk_excluded':risk_excluded, 'risk_included':risk_included, 'stream':stream, 'cache_dir':cache_dir, 'dedupe':dedupe, 'evidence_dir':evidence_dir, 'parser':parser}
+					if file_parts == []:
+						tasks.append({'file':file, 'future':executor.submit(worker_task, parse_file, parse_file_kwargs), 'part_futures':[], 'cache_key':None})
 					else:
-						confidence = ""
-						if not issue.find('confidence') == None:
-							confidence = issue.find('confidence').text
-						#
-						#	Target data mapping (breathmint <-> burp.xml):
-						#		ip <-> host ip
-						#		uri <-> host
-						#		port <-> None (port is determined using uri value)
-						#		path <-> path
-						#		location <-> location
-						#
-						#	note: ip and uri is in the <host> tag with the following format:
-						#			<host ip="10.1.2.3">https://www.example.org</host>
-						#
-						ip = issue.find('host').get('ip')
-						uri = issue.find('host').text
-						fqdn = ""
-						port = "443"
-						protocol = "https"
-						uri_split = uri.split(':')
-						if len(uri_split) == 3:
-							fqdn = re.sub(r'//', '', uri_split[1])
-							port = uri_split[2]
-						elif len(uri_split) == 2:
-							fqdn = re.sub(r'//', '', uri_split[1])
-							if uri_split[0] == "http":
-								port = "80"
-								protocol = "http"
-							elif uri_split[0] == "https":
-								port = "443"
-							else:
-								print("TODO: add default port number assignment to the code; protocol observed:", uri_split[0])
-						path = ""
-						if not issue.find('path') == None:
-							path = issue.find('path').text
-						location = ""
-						if not issue.find('location') == None:
-							location = issue.find('location').text
-						#
-						#	sometimes burp results put the same value in path and location, in which case it seems like location is really just the path
-						if location == path:
-							location = ""
-						#
-						#	Additional details data mapping (breathmint <-> burp.xml):
-						#		target_details <-> issueDetailItems
-						#		issue_details <-> issueDetail
-						#		issue_details <-> issueDetailItems (list with all issueDetail text)
-						#		requestresponse <-> requestresponse
-						#
-						target_details = []
-						if not issue.find('issueDetailItems') == None:
-							for item_detail in issue.find('issueDetailItems').iter('issueDetailItem'):
-								target_details.append(item_detail.text)
-						issue_details = ""
-						if not issue.find('issueDetail') == None:
-							issue_details = issue.find('issueDetail').text
-							issue_details = unicodedata.normalize("NFKD", issue_details)
-							issue_details = re.sub('&nbsp;', '', issue_details)
-							issue_details = make_me_pretty.fix_spacing_issues(contents=issue_details)
-							issue_details = make_me_pretty.remove_lxml_markup(contents=issue_details)
-							if not issue.find('issueDetailItems') == None:
-								for item_detail in issue.find('issueDetailItems').iter('issueDetailItem'):
-									new_detail = unicodedata.normalize("NFKD", item_detail.text)
-									new_detail = make_me_pretty.fix_spacing_issues(contents=new_detail)
-									new_detail = make_me_pretty.remove_lxml_markup(contents=new_detail)
-									issue_details += "\n" + new_detail
-						#
-						#	some burp extensions do not populate the background, remediation, and other fields properly
-						#		and instead throw everything into 'issueDetail'
-						#
-						if background == "":
-							background = issue_details
-						requestresponse = {}
-						request_count = 0
-						response_count = 0
-						if not issue.find('requestresponse') == None:
-							for request in issue.find('requestresponse').iter('request'):
-								requestresponse[str(request_count)] = {}
-								if request.get('base64') == "true":
-									requestresponse[str(request_count)]['request'] = request.text
-								else:
-									requestresponse[str(request_count)]['request'] = base64.b64encode(request.text.encode('utf-8', 'ignore'))
-								request_count += 1
-							for response in issue.find('requestresponse').iter('response'):
-								if response.get('base64') == "true":
-									requestresponse[str(response_count)]['response'] = response.text
-								else:
-									requestresponse[str(response_count)]['response'] = base64.b64encode(response.text.encode('utf-8', 'ignore'))
-								response_count += 1
-						#
-						#	now that we have all the data, add it to all_issues with user-friendly field names as keys
-						new_issue = {}
-						new_issue['Serial Number'] = serial_number
-						new_issue['Vulnerability Name'] = name
-						new_issue['Background'] = background
-						#
-						#	might be fun to determine a product name for common apps, but that is for another day
-						#	just a placeholder for now
-						new_issue['Product Name'] = ""
-						new_issue['Remediation'] = remediation
-						new_issue['References'] = references
-						new_issue['Classification'] = classification
-						new_issue['Risk'] = risk
-						new_issue['Severity'] = severity
-						new_issue['Confidence'] = confidence
-						new_issue['IP'] = ip
-						new_issue['URI'] = uri
-						new_issue['FQDN'] = fqdn
-						new_issue['Port'] = port
-						new_issue['Protocol'] = protocol
-						new_issue['Path'] = path
-						new_issue['Location'] = location
-						new_issue['Target Details'] = target_details
-						new_issue['Issue Details'] = issue_details
-						new_issue['Request Response'] = requestresponse
-						all_issues.append(new_issue)
-						issue_count += 1
+						print("Parsing: " + str(file) + " (" + str(len(file_parts)) + " parts)\n...")
+						part_futures = []
+						for byte_ranges in file_parts:
+							part_futures.append(executor.submit(worker_task, parse_file_part, {'file':file, 'byte_ranges':byte_ranges, 'risk_excluded':risk_excluded, 'risk_included':risk_included, 'stream':stream, 'dedupe':dedupe, 'evidence_dir':evidence_dir, 'parser':parser}))
+						tasks.append({'file':file, 'future':None, 'part_futures':part_futures, 'cache_key':cache_key, 'parse_file_kwargs':parse_file_kwargs})
+				#
+				#	collect in submission order (not completion order) to keep the merge deterministic
+				for task in tasks:
+					file = task['file']
+					try:
+						if not task['future'] == None:
+							file_issues, cache_counts = task['future'].result()
+							add_worker_cache_counts(cache_counts=cache_counts)
+							for issue in file_issues:
+								share_issue_values(issue=issue)
+							if not db_connection == None:
+								store_file_issues(connection=db_connection, file=file, issues=file_issues)
+							all_issues.extend(drop_duplicate_issues(issues=file_issues, seen_identities=seen_identities))
+						else:
+							#
+							#	if any part failed or stopped early, the part results are thrown away and the whole file is parsed again
+							#		with parse_file (here, in this process, since the worker pool may be what failed)
+							part_results = []
+							for part_future in task['part_futures']:
+								try:
+									part_result, cache_counts = part_future.result()
+								except Exception as e:
+									print("ERROR: breathmint.parse_files: Worker failed when parsing part of file: ", str(file))
+									print(e)
+									part_result = None
+								if (part_result == None or part_result[2] == False):
+									part_results = None
+									break
+								part_results.append((part_result, cache_counts))
+							if part_results == None:
+								print("Re-parsing: " + str(file) + " as a whole (a part of it could not be parsed)")
+								file_issues = parse_file(**task['parse_file_kwargs'])
+								if not db_connection == None:
+									store_file_issues(connection=db_connection, file=file, issues=file_issues)
+								all_issues.extend(drop_duplicate_issues(issues=file_issues, seen_identities=seen_identities))
+								continue
+							file_issues = []
+							#	duplicates that ended up in different parts of the file are dropped here; they do not count towards the serial number fallback
+							file_identities = set()
+							file_duplicates_removed = 0
+							for (part_issues, fallback_serial_numbers, part_complete), cache_counts in part_results:
+								add_worker_cache_counts(cache_counts=cache_counts)
+								file_duplicates_removed += cache_counts['duplicates']['removed']
+								fallback_serial_numbers = set(fallback_serial_numbers)
+								for index in range(len(part_issues)):
+									issue = part_issues[index]
+									if not issue.identity == None:
+										if issue.identity in file_identities:
+											DUPLICATE_COUNTS['removed'] += 1
+											file_duplicates_removed += 1
+											continue
+										file_identities.add(issue.identity)
+									#
+									#	the serial number fallback counts the issues kept so far in the whole file, not just in this part
+									if index in fallback_serial_numbers:
+										issue['Serial Number'] = str(len(file_issues))
+									file_issues.append(share_issue_values(issue=issue))
+							if not db_connection == None:
+								store_file_issues(connection=db_connection, file=file, issues=file_issues)
+							all_issues.extend(drop_duplicate_issues(issues=file_issues, seen_identities=seen_identities))
+							if not task['cache_key'] == None:
+								store_parse_cache(cache_dir=cache_dir, cache_key=task['cache_key'], file=file, issues=file_issues, duplicates_removed=file_duplicates_removed)
+							print("Finished: " + str(file))
+					except Exception as e:
+						print("===================")
+						print("\nERROR: breathmint.parse_files: Worker failed when parsing file: ", str(file))
+						print(e)
+						traceback.print_exc()
+						print("\n\t  moving on to next file")
+						print("===================")
+		for name,counts in normalization_cache_counts().items():
+			print("Normalization cache (" + name + "): " + str(counts['hits']) + " hits, " + str(counts['misses']) + " misses")
+		if not dedupe == None:
+			print("Duplicate issues removed (" + dedupe + "): " + str(DUPLICATE_COUNTS['removed']))
+		print("<< Finished parsing Burp files >>")
+		#	issues with a risk that is not in SORT_ORDER_RISK (e.g. no <severity>) go last, in file order
+		all_issues.sort(key=lambda k: SORT_ORDER_RISK.get(k['Risk'], len(SORT_ORDER_RISK)))
+	except Exception as e:
+		print('\n==== Exception ====\n  breathmint.parse_files()\n----')
+		print(e)
+		traceback.print_exc()
+		print('\n===================')
+	if not db_connection == None:
+		db_connection.close()
+	return all_issues
+
+
+#
+#
+#	pipeline_producer
+#
+#		the parsing half of '--pipeline'; runs in its own process and puts the issues on issue_queue as they are parsed
+#		the issues come out in the same order parse_files keeps them in before sorting (file_list order, duplicates dropped)
+#		without a parse cache or issue database the issues of each file are queued as they are parsed; with either of them each
+#		file is parsed by parse_file first (they work per file)
+#		note: only with stream (-s) is a file read one issue at a time; otherwise iterate_burp_issues still loads each file's
+#		whole tree, so the producer's memory grows with the largest file
+#
+#		parameters:
+#			issue_queue - multiprocessing queue; gets ('issues', [<<records>>]) messages and one final ('done', <<counts>>)
+#				<<counts>> are the cache and duplicate counts (and stopwatch snapshot) in the form worker_task reports them
+#			profile - True to time the stages in this process too (see enable_profiling)
+#			file_list, risk_excluded, risk_included, stream, cache_dir, db_path, dedupe, parser - see parse_files
+#
+#
+def pipeline_producer(issue_queue, file_list, risk_excluded=[], risk_included=[], stream=False, cache_dir=None, db_path=None, dedupe=None, evidence_dir=None, parser='etree', profile=False):
+	if profile == True:
+		enable_profiling()
+		stopwatch.reset()
+	db_connection = None
+	seen_identities = set()
+	batch = []
+	try:
+		print("<< Parsing Burp files >>")
+		SHARED_VALUES.clear()
+		DUPLICATE_COUNTS['removed'] = 0
+		if not db_path == None:
+			db_connection = mint_tin.open_issue_store(db_path=db_path, field_names=[attribute for name,attribute in ISSUE_FIELDS], store_version=int(PARSE_CACHE_VERSION))
+			if db_connection == None:
+				print("ERROR: breathmint.pipeline_producer: could not open the issue database; issues will not be stored:", db_path)
+		known_identities = None
+		if (not dedupe == None and cache_dir == None and db_connection == None):
+			known_identities = seen_identities
+		for file in file_list:
+			if (cache_dir == None and db_connection == None):
+				print("Parsing: " + str(file) + "\n...")
+				file_issues = (new_issue for new_issue,has_serial_number in parse_issue_elements(issues=iterate_burp_issues(file=file, stream=stream, parser=parser), risk_excluded=risk_excluded, risk_included=risk_included, dedupe=dedupe, known_identities=known_identities, evidence_dir=evidence_dir, recover=(parser == 'lxml')))
+			else:
+				file_issues = parse_file(file=file, risk_excluded=risk_excluded, risk_included=risk_included, stream=stream, cache_dir=cache_dir, dedupe=dedupe, evidence_dir=evidence_dir, parser=parser)
+				if not db_connection == None:
+					store_file_issues(connection=db_connection, file=file, issues=file_issues)
+			try:
+				for issue in drop_duplicate_issues(issues=file_issues, seen_identities=seen_identities):
+					batch.append(issue.to_record())
+					if len(batch) >= PIPELINE_BATCH_SIZE:
+						issue_queue.put(('issues', batch))
+						batch = []
 			except Exception as e:
 				print("===================")
-				print("\nERROR: breathmint.parse_files: Exception thrown when parsing file: ", str(file))
+				print("\nERROR: breathmint.pipeline_producer: Exception thrown when parsing file: ", str(file))
 				print(e)
 				traceback.print_exc()
 				print("\n\t  moving on to next file")
 				print("===================")
-			print("Finished: " + str(file))
-		print("<< Finished parsing Burp files >>")
-		all_issues.sort(key=lambda k: SORT_ORDER_RISK[k['Risk']])
+			if (cache_dir == None and db_connection == None):
+				print("Finished: " + str(file))
+		if not batch == []:
+			issue_queue.put(('issues', batch))
 	except Exception as e:
-		print('\n==== Exception ====\n  breathmint.parse_files()\n----')
+		print('\n==== Exception ====\n  breathmint.pipeline_producer()\n----')
 		print(e)
 		traceback.print_exc()
 		print('\n===================')
-	return all_issues
+	if not db_connection == None:
+		db_connection.close()
+	counts = normalization_cache_counts(include_workers=False)
+	counts['duplicates'] = {'removed':DUPLICATE_COUNTS['removed']}
+	if profile == True:
+		counts['profile'] = stopwatch.snapshot()
+	issue_queue.put(('done', counts))
+
+
+#
+#
+#	pipeline_issues
+#
+#		the writing half of '--pipeline': start pipeline_producer in a separate process and yield its issues, sorted by risk
+#		exactly like parse_files, while the producer is still parsing
+#
+#		the issues of the highest reported risk are yielded as soon as they arrive (nothing can come before them); the other
+#		risks are held back until parsing is done, in memory up to PIPELINE_BUFFER_SIZE issues and in temporary spill files
+#		(pickled batches of records) beyond that, and then yielded in risk order
+#		that bounds the memory between the two stages; the producer (see pipeline_producer) and the writer (without constant_memory)
+#		can still use memory in proportion to the input
+#		if the producer stops without finishing (killed, crashed, ...), a RuntimeError is raised once the issues received so far
+#		have been yielded, so the caller does not write output that looks complete
+#		the issues are not put through share_issue_values: the writer holds one at a time, so interning their values would
+#		only grow SHARED_VALUES for the whole run
+#
+#		parameters:
+#			file_list, risk_excluded, risk_included, stream, cache_dir, db_path, dedupe, parser - see parse_files
+#
+#		yields:
+#			issues
+#
+#
+def pipeline_issues(file_list, risk_excluded=[], risk_included=[], stream=False, cache_dir=None, db_path=None, dedupe=None, evidence_dir=None, parser='etree'):
+	risk_position = [attribute for name,attribute in ISSUE_FIELDS].index('risk')
+	reported_risks = sorted([risk for risk in SORT_ORDER_RISK.keys() if risk_is_reported(risk=risk, risk_excluded=risk_excluded, risk_included=risk_included) == True], key=lambda k: SORT_ORDER_RISK[k])
+	head_risk = None
+	if not reported_risks == []:
+		head_risk = reported_risks[0]
+	#	{'<<risk>>':[<<records>>]}, {'<<risk>>':<<spill file>>}
+	risk_buffers = {}
+	spill_files = {}
+	buffered = 0
+	issue_queue = multiprocessing.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+	producer = multiprocessing.Process(target=pipeline_producer, kwargs={'issue_queue':issue_queue, 'file_list':file_list, 'risk_excluded':risk_excluded, 'risk_included':risk_included, 'stream':stream, 'cache_dir':cache_dir, 'db_path':db_path, 'dedupe':dedupe, 'evidence_dir':evidence_dir, 'parser':parser, 'profile':stopwatch.ENABLED}, daemon=True)
+	producer.start()
+	producer_done = False
+	try:
+		while True:
+			try:
+				message_type, payload = issue_queue.get(timeout=PIPELINE_POLL_SECONDS)
+			except queue.Empty:
+				if not producer.is_alive():
+					break
+				continue
+			if message_type == 'done':
+				DUPLICATE_COUNTS['removed'] = 0
+				add_worker_cache_counts(cache_counts=payload)
+				producer_done = True
+				break
+			for record in payload:
+				risk = record[risk_position]
+				if risk == head_risk:
+					yield Issue.from_record(record)
+				else:
+					risk_buffers.setdefault(risk, []).append(record)
+					buffered += 1
+			if buffered > PIPELINE_BUFFER_SIZE:
+				for risk,records in risk_buffers.items():
+					if not risk in spill_files.keys():
+						spill_files[risk] = tempfile.TemporaryFile()
+					pickle.dump(records, spill_files[risk], protocol=pickle.HIGHEST_PROTOCOL)
+				risk_buffers = {}
+				buffered = 0
+		producer.join()
+		if (producer_done == False or not producer.exitcode == 0):
+			print("ERROR: breathmint.pipeline_issues: the parsing process stopped unexpectedly (exit code " + str(producer.exitcode) + "); the output is incomplete")
+			raise RuntimeError("breathmint.pipeline_issues: the parsing process stopped unexpectedly (exit code " + str(producer.exitcode) + ")")
+		for name,counts in normalization_cache_counts().items():
+			print("Normalization cache (" + name + "): " + str(counts['hits']) + " hits, " + str(counts['misses']) + " misses")
+		if not dedupe == None:
+			print("Duplicate issues removed (" + dedupe + "): " + str(DUPLICATE_COUNTS['removed']))
+		print("<< Finished parsing Burp files >>")
+		for risk in sorted(set(risk_buffers.keys()) | set(spill_files.keys()), key=lambda k: SORT_ORDER_RISK.get(k, len(SORT_ORDER_RISK))):
+			if risk in spill_files.keys():
+				spill_files[risk].seek(0)
+				while True:
+					try:
+						records = pickle.load(spill_files[risk])
+					except EOFError:
+						break
+					for record in records:
+						yield Issue.from_record(record)
+			for record in risk_buffers.get(risk, []):
+				yield Issue.from_record(record)
+	finally:
+		for spill_file in spill_files.values():
+			spill_file.close()
+		if producer.is_alive():
+			producer.terminate()
+			producer.join()
 
 
 #
@@ -428,24 +1950,57 @@ def parse_files(file_list, risk_excluded=[], risk_included=[]):
 #
 if __name__ == '__main__':
 	parser = argparse.ArgumentParser()
-	parser.add_argument("-d", help="Location of the directory in which the Burp issues XML files are stored (all .xml files will be opened).")
-	parser.add_argument("-f", help="Name of the single Burp file you want to parse. Ignored if '-d' option is used.")
+	parser.add_argument("-d", help="Location of the directory in which the Burp issues XML files are stored (searched recursively; every .xml file whose root element has a burpVersion attribute will be parsed).")
+	parser.add_argument("--include", help="('--include <comma,separated,globs>') With '-d' (or a .zip '-f'), only consider files (zip members) matching these globs (matched against the file name and the path below '-d'; default == " + ",".join(DISCOVERY_INCLUDE_DEFAULT) + ").")
+	parser.add_argument("--exclude", help="('--exclude <comma,separated,globs>') With '-d', skip files and subdirectories matching these globs (e.g. 'old/*,*-draft.xml').")
+	parser.add_argument("-f", help="Name of the single Burp file you want to parse ('-' == standard input; gzip/xz/bz2/zstd compressed files are read directly; a .zip file means every Burp file in it, '<zip file>!<member>' one of them). Ignored if '-d' option is used.")
 	parser.add_argument("-e", help="('-e <comma,separated,list>') List of risk ratings to exclude from output; partial starting characters accepted; no spaces (default == none excluded).")
 	parser.add_argument("-i", help="('-i <comma,separated,list>') List of severity ratings to include in output; partial starting characters accepted; no spaces (default == include all).")
-	parser.add_argument("-o", help="Base name of output file(s) to which you want the parsed results to be written.")
+	parser.add_argument("-o", help="Base name of output file(s) to which you want the parsed results to be written; a .csv, .jsonl or .parquet extension also sets '--format'.")
+	parser.add_argument("--format", choices=["xlsx"] + exportify.EXPORT_FORMATS, help="Output format (default == xlsx, or the '-o' extension); csv, jsonl and parquet are written row by row with every issue field, for loading into pandas/DuckDB/Spark or a SIEM (parquet requires the pyarrow module).")
+	parser.add_argument("-s", "--stream", action="store_true", help="Parse each Burp file incrementally, one issue at a time, so memory use stays flat for very large files.")
+	parser.add_argument("--parser", choices=PARSER_BACKENDS, default="etree", help="XML parser backend (default == etree); 'lxml' is faster on large exports, has no limit on text node size and recovers every readable issue from a malformed or truncated file when the whole file is parsed (with '-s' it stops at the first damaged element) (requires the lxml module).")
+	parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes used to parse the Burp files, one file per task (default == 1).")
+	parser.add_argument("--split", action="store_true", help="Split each Burp file into byte ranges at <issue> boundaries so a single huge file is parsed by all '-j' workers.")
+	parser.add_argument("--cache-dir", help="Directory for the parse cache; Burp files that have not changed since the last run are loaded from the cache instead of being parsed again.")
+	parser.add_argument("--cache-prune", type=float, help="('--cache-prune <days>') Remove parse cache entries that have not been used in the given number of days before parsing (requires '--cache-dir').")
+	parser.add_argument("--db", help="SQLite issue database to which the parsed issues are also written (one set of rows per Burp file; parsing a file again replaces its rows).")
+	parser.add_argument("--dedupe", choices=DEDUPE_MODES, help="Drop duplicate issues (e.g. from overlapping exports or re-scans); 'serial' matches on the Burp serialNumber, 'content' on a hash of the name, URI, path, location and issue detail.")
+	parser.add_argument("-g", "--group", action="store_true", help="One row per Vulnerability Name + Risk, with a 'Target' column listing every affected target, instead of one row per issue instance.")
+	parser.add_argument("-m", "--constant-memory", action="store_true", help="Write the workbook in constant memory mode: each row is flushed to disk as soon as it is written, so writer memory stays flat for very large reports.")
+	parser.add_argument("--evidence", help="Content-addressed evidence store directory: request/response bodies are written to <dir>/<sha256[:2]>/<sha256> (each distinct body once) and the issues, database and output refer to those files instead of holding the base64 text.")
+	parser.add_argument("--pipeline", action="store_true", help="Parse in a separate process and write the output while parsing is still going on; issues the writer cannot use yet are spilled to temporary files. Memory only stays bounded together with '-s' (parse one issue at a time) and '-m' (constant memory writer). '-j'/'--split' are not used in this mode.")
+	parser.add_argument("--profile", action="store_true", help="Time each parsing/normalization/writing stage (calls, wall time, characters in/out) and count issues, bytes and cells; prints a summary table and writes the full report to <output base>--profile--<date>.json.")
+	parser.add_argument("--from-db", help="Make the report from this SQLite issue database instead of parsing Burp files; '-e'/'-i' filter the stored issues and '-d'/'-f' limit the report to those Burp files (default == all stored files).")
 	args = parser.parse_args()
+	if (args.parser == "lxml" and lxml == None):
+		print("ERROR: breathmint.__main__: '--parser lxml' needs the lxml module (pip install lxml)")
+		sys.exit()
+	if args.profile == True:
+		enable_profiling()
 
 	print("\n\n" + breathmint_logo() + "\n\nRunning breathmint\n...\n")
 	print("<< Finding Burp output files >>")
 	file_list = []
+	include_globs = None
+	exclude_globs = []
+	if args.include:
+		include_globs = args.include.split(',')
+	if args.exclude:
+		exclude_globs = args.exclude.split(',')
 	try:
 		if args.d:
-			file_list = find_burp_output(args.d)
+			file_list = find_burp_output(directory=args.d, include=include_globs, exclude=exclude_globs)
 		elif args.f:
-			file_list.append(args.f)
+			if (args.f.lower().endswith(".zip") and zipfile.is_zipfile(args.f)):
+				file_list = sniff_burp_files(candidates=zip_burp_members(zip_file=args.f, include=include_globs, exclude=exclude_globs))
+			else:
+				file_list.append(args.f)
+		elif args.from_db:
+			print("Reporting on every Burp file in the issue database:", args.from_db)
 		else:
 			print("No directory or file argument provided. Trying current directory.")
-			file_list = find_burp_output('.')
+			file_list = find_burp_output(directory='.', include=include_globs, exclude=exclude_globs)
 	except Exception as e:
 		print("===================")
 		print("\nERROR: breathmint.__main__: Something went wrong when trying to get .xml file(s). This is not my fault. You failed miserably and should feel bad.")
@@ -454,11 +2009,12 @@ if __name__ == '__main__':
 		print("===================")
 		sys.exit()
 	print("<< Finished finding Burp output files >>")
-	if file_list == []:
+	if (file_list == [] and not args.from_db):
 		print("\nNote: input file list is empty; that's bad. But also we're done. That's good. Better luck next time. The sprinkles are also cursed.")
 		sys.exit()
 
 	output_filename_base = "burp-output"
+	output_format = "xlsx"
 	try:
 		if args.o:
 			output_filename_base = str(args.o)
@@ -468,8 +2024,13 @@ if __name__ == '__main__':
 				output_filename_base = output_filename_base.replace(".xlsx", "")
 			elif output_filename_base.endswith(".docx"):
 				output_filename_base = output_filename_base.replace(".docx", "")
+			else:
+				for export_format in exportify.EXPORT_FORMATS:
+					if output_filename_base.endswith("." + export_format):
+						output_filename_base = output_filename_base[:-len("." + export_format)]
+						output_format = export_format
 		elif len(file_list) == 1:
-			output_filename_base = file_list[0].replace(".xml", "")
+			output_filename_base = output_base_name(file_list[0])
 	except Exception as e:
 		print("===================")
 		print("\nERROR: breathmint.__main__: Something went wrong when trying to get output filename base:")
@@ -477,6 +2038,8 @@ if __name__ == '__main__':
 		traceback.print_exc()
 		print("===================")
 		sys.exit()
+	if args.format:
+		output_format = args.format
 
 	risk_excluded = []
 	risk_included = []
@@ -513,6 +2076,7 @@ if __name__ == '__main__':
 
 	#
 	#	all_issues format:
+	#		(each issue is an Issue record; it reads like the dictionary below)
 	#	[
 	#		{
 	#			'Serial Number':"<<serialNumber>>",
@@ -520,8 +2084,8 @@ if __name__ == '__main__':
 	#			'Background':"<<issueBackground>>",
 	#			'Product Name':"",
 	#			'Remediation':"<<remediationBackground>>",
-	#			'References':[{'url':"<<reference_0_url>>", 'displaytext':"<<reference_0_displaytext>>"}, ..., {'url':"<<reference_n_url>>", 'displaytext':"<<reference_n_displaytext>>"}],
-	#			'Classification':"<<vulnerabilityClassifications>>",
+	#			'References':("<<reference_0_url>>", ..., "<<reference_n_url>>"),		(shared tuple; see share_issue_values)
+	#			'Classification':("<<vulnerabilityClassification_0_url>>", ..., "<<vulnerabilityClassification_n_url>>"),
 	#			'Risk':"<<risk>> == severity | RISK_SYNONYM_MAPPING[severity]",		(trying to enforce a common set of risk ratings)
 	#			'Severity':"<<severity>>",
 	#			'Confidence':"<<confidence>>",
@@ -537,38 +2101,89 @@ if __name__ == '__main__':
 	#			'Request Response':{
 	#				'0':{ 'request':"<<base64(request)>>", 'response':"<<base64(response)>>", 'redirected':True|False(<<responseRedirected>>) }, ...,
 	#				'n':{ 'request':"<<base64(request)>>", 'response':"<<base64(response)>>", 'redirected':True|False(<<responseRedirected>>) }
-	#			}
+	#			}		(with '--evidence', the evidence file paths instead of the base64 text; see store_evidence)
 	#		},
 	#		...,
 	#		{'Serial Number':"<<serialNumber>>", ..., 'Request Response':{}}
 	#	]
 	#
+	if not args.cache_prune == None:
+		if args.cache_dir == None:
+			print("ERROR: breathmint.__main__: '--cache-prune' requires '--cache-dir'; parse cache not pruned")
+		elif os.path.isdir(args.cache_dir):
+			print("Pruned parse cache:", prune_parse_cache(cache_dir=args.cache_dir, max_age_days=args.cache_prune), "entries removed")
+	#
+	#	standard input can only be read by this process (worker and pipeline processes are started with an empty stdin)
+	if (STDIN_INPUT in file_list and not args.from_db):
+		if (args.jobs > 1 or args.split == True or args.pipeline == True):
+			print("Note: '-f -' is read by this process; '-j'/'--split'/'--pipeline' are ignored")
+		args.jobs = 1
+		args.pipeline = False
 	all_issues = []
 	try:
-		all_issues = parse_files(file_list=file_list, risk_excluded=risk_excluded, risk_included=risk_included)
+		if args.from_db:
+			#
+			#	all_issues is a generator here: the rows are streamed from the database query straight into the workbook
+			db_connection = None
+			if os.path.isfile(args.from_db):
+				db_connection = mint_tin.open_issue_store(db_path=args.from_db, field_names=[attribute for name,attribute in ISSUE_FIELDS], store_version=int(PARSE_CACHE_VERSION))
+			if db_connection == None:
+				print("ERROR: breathmint.__main__: could not open the issue database:", args.from_db)
+				sys.exit()
+			source_files = [input_source_name(file) for file in file_list]
+			issue_count = mint_tin.count_issues(connection=db_connection, risk_excluded=risk_excluded, risk_included=risk_included, source_files=source_files)
+			print("<< Reading issues from the issue database >>")
+			print("Matching issues:", issue_count)
+			if issue_count > 0:
+				all_issues = (Issue.from_record(record) for record in mint_tin.query_issues(connection=db_connection, field_names=[attribute for name,attribute in ISSUE_FIELDS], risk_excluded=risk_excluded, risk_included=risk_included, source_files=source_files))
+		elif args.pipeline == True:
+			#
+			#	all_issues is a generator here too: issues go from the parsing process straight into the output while the files are parsed
+			if (args.jobs > 1 or args.split == True):
+				print("Note: '--pipeline' parses in a single producer process; '-j'/'--split' are ignored")
+			all_issues = pipeline_issues(file_list=file_list, risk_excluded=risk_excluded, risk_included=risk_included, stream=args.stream, cache_dir=args.cache_dir, db_path=args.db, dedupe=args.dedupe, evidence_dir=args.evidence, parser=args.parser)
+		else:
+			all_issues = parse_files(file_list=file_list, risk_excluded=risk_excluded, risk_included=risk_included, stream=args.stream, jobs=args.jobs, split_files=args.split, cache_dir=args.cache_dir, db_path=args.db, dedupe=args.dedupe, evidence_dir=args.evidence, parser=args.parser)
 		if all_issues == []:
 			print("ERROR: breathmint.__main__: parse_files returned a blank result")
 		else:
 			print("<< Generating output files >>")
 			#
 			#	assuming files were parsed correctly, we can make the output
-			excelsify_workbook_name = output_filename_base + "--parsed--" + datetime.datetime.now().strftime('%Y%m%d_%H%M') + ".xlsx"
+			excelsify_workbook_name = output_filename_base + "--parsed--" + datetime.datetime.now().strftime('%Y%m%d_%H%M') + "." + output_format
 			print("Generating:", excelsify_workbook_name)
 			#
 			#	pick your preferred columns in the order you want them to be placed in the output
 			#	column names must match the keys in each issue dictionary in the all_issues list
 			output_column_names = ["Vulnerability Name", "Background", "Remediation", "References", "Classification", "Risk", "Confidence", "URI", "Path", "Location", "Target Details", "Issue Details"]
+			if not output_format == "xlsx":
+				#
+				#	data exports are for other tools, so they get every issue field
+				output_column_names = [name for name,attribute in ISSUE_FIELDS]
+			elif args.evidence:
+				#
+				#	with an evidence store the request/response column is just the evidence file paths, so it fits in the workbook
+				output_column_names.append("Request Response")
+			if args.group == True:
+				#
+				#	instance specific columns make no sense for a group; the targets are listed in 'Target' instead
+				output_column_names = ["Vulnerability Name", "Background", "Remediation", "References", "Classification", "Risk", "Confidence", "Target"]
+				all_issues = group_issues(issues=all_issues)
+				print("Grouped into", len(all_issues), "rows")
 			excelsify_worksheet_data = {}
-			ws = excelsify.create_worksheet_data(output_column_names=output_column_names, issue_data_list=all_issues)
+			ws = excelsify.create_worksheet_data(output_column_names=output_column_names, issue_data_list=all_issues, normalized_column_names=NORMALIZED_ISSUE_FIELDS)
 			if ws == {}:
 				print("ERROR: create_worksheet_data returned a blank dictionary")
 			else:
 				excelsify_worksheet_data['Burp Issues'] = ws
-			success = excelsify.create_workbook(worksheet_data=excelsify_worksheet_data, out_filename=excelsify_workbook_name)
+			if output_format == "xlsx":
+				success = excelsify.create_workbook(worksheet_data=excelsify_worksheet_data, out_filename=excelsify_workbook_name, constant_memory=args.constant_memory)
+			else:
+				success = (not ws == {} and exportify.export_worksheet(worksheet_data=ws, out_filename=excelsify_workbook_name, out_format=output_format))
 			if success == True:
 				print("...\nFinished:", excelsify_workbook_name)
 			else:
-				print("ERROR: Failed to generate excel output file:", excelsify_workbook_name)
+				print("ERROR: Failed to generate " + output_format + " output file:", excelsify_workbook_name)
 			print("<< Finished generating output files >>")
 	except Exception as e:
 		print("===================")
@@ -577,3 +2192,8 @@ if __name__ == '__main__':
 		traceback.print_exc()
 		print("===================")
 		sys.exit()
+	if args.profile == True:
+		profile_report_name = output_filename_base + "--profile--" + datetime.datetime.now().strftime('%Y%m%d_%H%M') + ".json"
+		print("<< Profile >>")
+		if stopwatch.write_report(out_filename=profile_report_name) == True:
+			print("Profile report written to:", profile_report_name)
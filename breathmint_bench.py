@@ -0,0 +1,823 @@
+#!/usr/bin/python3
+'''
+breathmint_bench
+	Benchmarks for breathmint, excelsify and make_me_pretty
+
+	usage:
+		python breathmint_bench.py fix_spacing [--sizes 1000,10000,100000] [--check 20000]
+		python breathmint_bench.py render [--rows 5000] [--check 5000]
+		python breathmint_bench.py markup [--iterations 1000]
+		python breathmint_bench.py generate -o synthetic.xml [--issues 10000] [--issue-types 50] [--markup 0.3] [--whitespace 0.2] [--payload 512]
+		python breathmint_bench.py suite [--scales 1000,10000] [--issue-types 50] [--markup 0.3] [--whitespace 0.2] [--payload 512] [--repeat 1] [--json results.json]
+'''
+
+#
+#
+# -- import public modules --
+#
+#
+import argparse
+import random
+import re
+import string
+import time
+import traceback
+import sys
+import os
+import tempfile
+import base64
+import contextlib
+import datetime
+import json
+import platform
+import tracemalloc
+from bs4 import BeautifulSoup
+
+#
+#
+# -- import private modules --
+#
+#
+import make_me_pretty
+import excelsify
+import breathmint
+
+#
+#
+# -- Global variables --
+#
+#
+FIX_SPACING_SIZES_DEFAULT = "1000,10000,100000"
+FIX_SPACING_CHECK_DEFAULT = 20000
+FIX_SPACING_ALPHABET = [' ', ' ', ' ', '\t', '\n', '\n', ';', ':', ',', '(', ')', 'a', 'b', '\r', '\xa0']
+RENDER_ROWS_DEFAULT = 5000
+RENDER_CHECK_DEFAULT = 5000
+RENDER_COLUMN_NAMES = ["Vulnerability Name", "Background", "Remediation", "References", "Classification", "Risk", "Confidence", "URI", "Path", "Location", "Target Details", "Issue Details"]
+RENDER_ALPHABET = [' ', '\n', '\t', '=', '-', '+', '@', '/', '<', '<b>', '</b>', '<p>', '&amp;', 'a', 'b', 'c', 'Critical', 'uri']
+#
+#	markup benchmark corpus: (name, HTML) pairs that are hard to get right without a real HTML parser
+#		make_me_pretty.strip_markup_fast must either return exactly BeautifulSoup(contents, "lxml").text or None (fall back)
+MARKUP_ITERATIONS_DEFAULT = 1000
+MARKUP_CORPUS = []
+MARKUP_CORPUS.append(('burp background', "<p>The application fails to prevent users from connecting to it over <b>unencrypted</b> connections.</p><p>An attacker able to modify a user's network traffic could bypass the application's use of SSL/TLS encryption.</p>"))
+MARKUP_CORPUS.append(('burp remediation list', "<p>Ensure that:</p><ul>\n<li>the <code>Secure</code> flag is set;</li>\n<li>the <a href=\"https://example.org/cookies\">cookie</a> is scoped.</li>\n</ul>"))
+MARKUP_CORPUS.append(('named entities', "Tom &amp; Jerry &lt;b&gt;not bold&lt;/b&gt; &quot;quoted&quot;&nbsp;non-breaking"))
+MARKUP_CORPUS.append(('numeric entities', "caf&#233; &#x27;single&#x27; &#60;tag&#62;"))
+MARKUP_CORPUS.append(('other named entities', "&copy; 2024 &eacute;t&eacute; &hellip;"))
+MARKUP_CORPUS.append(('bare ampersands', "a & b && c &; d&e"))
+MARKUP_CORPUS.append(('unterminated entities', "&amp &lt &gtx &nbsp;&nbsp"))
+MARKUP_CORPUS.append(('cdata', "<p>before <![CDATA[<b>not bold</b> & raw]]> after</p>"))
+MARKUP_CORPUS.append(('comment', "<p>one<!-- hidden <b>text</b> --> two</p>"))
+MARKUP_CORPUS.append(('unterminated comment', "<p>one<!-- never closed <b>x</b></p>"))
+MARKUP_CORPUS.append(('nested tags', "<ul><li>one <b>bold <i>bold italic</i></b> <span><em>em</em></span></li><li>two</li></ul>"))
+MARKUP_CORPUS.append(('unclosed blocks', "<p>one<p>two<ul><li>three<li>four</ul>"))
+MARKUP_CORPUS.append(('unclosed inline', "<b>bold <i>bold italic"))
+MARKUP_CORPUS.append(('stray closing tags', "text</b> more</p></ul> end"))
+MARKUP_CORPUS.append(('mismatched nesting', "<b>bold <i>both</b> italic</i>"))
+MARKUP_CORPUS.append(('block inside inline', "<b>bold <div>block</div> tail</b>"))
+MARKUP_CORPUS.append(('list item outside list', "<li>orphan</li><p>para</p>"))
+MARKUP_CORPUS.append(('script', "<p>x</p><script>var a = '<b>' + (1 < 2) + '&amp;';</script><p>y</p>"))
+MARKUP_CORPUS.append(('style', "<style>p > b { color: red; }</style><p>styled</p>"))
+MARKUP_CORPUS.append(('attribute containing >', "<a href=\"https://example.org/?a>b\" title='x > y'>link</a> after"))
+MARKUP_CORPUS.append(('unquoted attribute', "<span class=note>note</span> <a href=https://example.org/>bare</a>"))
+MARKUP_CORPUS.append(('attribute without value', "<code hidden>code</code>"))
+MARKUP_CORPUS.append(('line breaks', "line<br>two<br/>three<br />four</br>five"))
+MARKUP_CORPUS.append(('upper case tags', "<P>para</P><B>bold</B><BR>"))
+MARKUP_CORPUS.append(('whitespace', "  <p>\n  spaced  </p>\n\n<p>\tnext</p>  \n"))
+MARKUP_CORPUS.append(('stray angle brackets', "if a < b and c > d then 1<2"))
+MARKUP_CORPUS.append(('unknown tags', "<table><tr><td>a</td><td>b</td></tr></table><pre>  keep\n   spaces</pre><custom>x</custom>"))
+MARKUP_CORPUS.append(('control characters', "<p>a\x01b\x1fc</p>"))
+MARKUP_CORPUS.append(('plain text', "No markup at all; just text (with punctuation), and spaces."))
+MARKUP_CORPUS.append(('empty', ""))
+SYNTHETIC_ISSUES_DEFAULT = 10000
+SYNTHETIC_ISSUE_TYPES_DEFAULT = 50
+#	chance that a word is wrapped in inline markup / followed by a whitespace run instead of one space
+SYNTHETIC_MARKUP_DEFAULT = 0.3
+SYNTHETIC_WHITESPACE_DEFAULT = 0.2
+#	bytes of response body per request/response pair (before base64)
+SYNTHETIC_PAYLOAD_DEFAULT = 512
+SYNTHETIC_SEVERITIES = ["High", "Medium", "Low", "Information"]
+SYNTHETIC_CONFIDENCES = ["Certain", "Firm", "Tentative"]
+SYNTHETIC_WORDS = ["the", "application", "request", "response", "parameter", "value", "attacker", "user", "session", "cookie", "header", "server", "input", "output", "script", "encoding", "browser", "token", "data", "HTTPS", "should", "could", "is", "not", "any", "of", "a", "(for", "example)", "ensure:", "page;", "issue,"]
+SYNTHETIC_INLINE_TAGS = ["b", "i", "code", "strong", "em"]
+SUITE_SCALES_DEFAULT = "1000,10000"
+
+#
+#
+# -- Function declarations --
+#
+#
+
+#
+#
+#	fix_spacing_issues_reference
+#
+#		the original (loop based) make_me_pretty.fix_spacing_issues
+#		kept here as the reference for the equivalence check and as the "before" number in the benchmark
+#
+#
+def fix_spacing_issues_reference(contents):
+	if (contents == None or contents == ''):
+		return ''
+	contents = contents.strip()
+	while '  ' in contents:
+		contents = contents.replace('  ', ' ')
+	while '\n ' in contents:
+		contents = contents.replace('\n ', '\n')
+	while ' \n' in contents:
+		contents = contents.replace(' \n', '\n')
+	while ' \t' in contents:
+		contents = contents.replace(' \t', '\t')
+	while '\t ' in contents:
+		contents = contents.replace('\t ', '\t')
+	while '\n\n' in contents:
+		contents = contents.replace('\n\n', '\n')
+	while '\t\t' in contents:
+		contents = contents.replace('\t\t', '\t')
+	while '\t\n' in contents:
+		contents = contents.replace('\t\n', '\n')
+	while '\n;' in contents:
+		contents = contents.replace('\n;', ';')
+	contents = contents.replace(' :', ':')
+	contents = contents.replace(' ;', ';')
+	contents = contents.replace(' ,', ',')
+	contents = contents.replace('( ', '(')
+	contents = contents.replace(' )', ')')
+	if contents.endswith('\n'):
+		contents = contents[:-1]
+	if contents.startswith('\n'):
+		contents = contents[1:]
+	return contents
+
+
+#
+#
+#	adversarial_whitespace
+#
+#		inputs that make the loop based fix_spacing_issues rescan/copy the string over and over
+#
+#		returns:
+#			{'<<input name>>':"<<input string of about size characters>>", ...}
+#
+#
+def adversarial_whitespace(size):
+	retval = {}
+	retval['one long space run'] = "a" + (" " * size) + "b"
+	retval['space/newline runs'] = ("x" + " " * 64 + "\n" * 64) * max(1, size // 129)
+	retval['newline/tab ladder'] = "x" + ("\n\t" * (size // 2)) + "\n;"
+	retval['doubling space runs'] = "x" + "".join(" " * (2 ** k) + "y" for k in range(max(1, size.bit_length() - 1)))
+	retval['issueDetail-ish'] = ("word  \t  \n\n  (  value  ) ,  " * max(1, size // 30))
+	return retval
+
+
+#
+#
+#	time_call
+#
+#		returns:
+#			best wall time (seconds) of repeat calls to function(contents)
+#
+#
+def time_call(function, contents, repeat=3):
+	best = None
+	for i in range(repeat):
+		start = time.perf_counter()
+		function(contents)
+		elapsed = time.perf_counter() - start
+		if (best == None or elapsed < best):
+			best = elapsed
+	return best
+
+
+#
+#
+#	check_fix_spacing
+#
+#		compare make_me_pretty.fix_spacing_issues against fix_spacing_issues_reference on random whitespace-heavy strings
+#
+#		returns:
+#			list of inputs that produced different output ([] == all good)
+#
+#
+def check_fix_spacing(count, seed=0):
+	mismatches = []
+	generator = random.Random(seed)
+	for i in range(count):
+		contents = ''.join(generator.choice(FIX_SPACING_ALPHABET) for j in range(generator.randint(0, 40)))
+		if not make_me_pretty.fix_spacing_issues(contents=contents) == fix_spacing_issues_reference(contents):
+			mismatches.append(contents)
+	return mismatches
+
+
+#
+#
+#	bench_fix_spacing
+#
+#		time the loop based and the current fix_spacing_issues on adversarial_whitespace inputs of each size
+#
+#		returns:
+#			[{'input':"<<name>>", 'size':<<size>>, 'reference_seconds':<<t>>, 'current_seconds':<<t>>, 'match':True|False}, ...]
+#
+#
+def bench_fix_spacing(sizes):
+	results = []
+	for size in sizes:
+		for name,contents in adversarial_whitespace(size=size).items():
+			reference_seconds = time_call(fix_spacing_issues_reference, contents)
+			current_seconds = time_call(make_me_pretty.fix_spacing_issues, contents)
+			match = (make_me_pretty.fix_spacing_issues(contents) == fix_spacing_issues_reference(contents))
+			if match == False:
+				print("ERROR: fix_spacing_issues output differs from the reference for input:", name, size)
+			results.append({'input':name, 'size':size, 'reference_seconds':reference_seconds, 'current_seconds':current_seconds, 'match':match})
+	return results
+
+
+#
+#
+#	safe_to_write_string_reference
+#
+#		the original (concatenation based) make_me_pretty.safe_to_write_string, without the exception handling
+#
+#
+def safe_to_write_string_reference(contents):
+	retval = """"""
+	if isinstance(contents, str):
+		while any(contents.startswith(x) for x in make_me_pretty.NO_START_PUNCTUATION):
+			contents = contents[1:]
+		contents = contents.strip()
+	if len(contents) > 0:
+		if type(contents) is dict:
+			for key,val in contents.items():
+				if key in make_me_pretty.SORT_ORDER_RISK.keys():
+					retval = retval + str(key) + """:\n"""
+					retval = retval + safe_to_write_string_reference(val)
+				elif key in make_me_pretty.TARGET_DICT_KEYS:
+					if len(val) == 0:
+						retval = retval + """\n"""
+					else:
+						retval = retval + safe_to_write_string_reference(val)
+				else:
+					retval = retval + str(key) + """\n"""
+					if (type(val) is dict or type(val) is list or type(val) is tuple):
+						retval = retval + safe_to_write_string_reference(val)
+					else:
+						retval = retval + str(val) + """\n"""
+		elif (type(contents) is list or type(contents) is tuple):
+			for val in contents:
+				if (type(val) is dict or type(val) is list or type(val) is tuple):
+					retval = retval + safe_to_write_string_reference(val)
+				else:
+					retval = retval + str(val) + """\n"""
+		else:
+			retval = str(contents) + """\n"""
+	return retval
+
+
+#
+#
+#	render_cell_reference
+#
+#		the original per-cell chain in excelsify.create_workbook (font lookup, then the three text passes)
+#
+#
+def render_cell_reference(column_name, contents):
+	cell_font = excelsify.determine_cell_font(field_name=column_name)
+	safe_string = safe_to_write_string_reference(contents)
+	safe_string = make_me_pretty.remove_lxml_markup(contents=safe_string)
+	safe_string = make_me_pretty.fix_spacing_issues(contents=safe_string)
+	if safe_string.endswith("""\n"""):
+		safe_string = safe_string[:-1]
+	return (cell_font, safe_string)
+
+
+#
+#
+#	random_cell_value
+#
+#		random str/list/tuple/dict cell value built from RENDER_ALPHABET, nested up to depth levels
+#
+#
+def random_cell_value(generator, depth=2):
+	kind = generator.choice(['str', 'str', 'list', 'tuple', 'dict'] if depth > 0 else ['str'])
+	if kind == 'str':
+		return ''.join(generator.choice(RENDER_ALPHABET) for i in range(generator.randint(0, 12)))
+	items = [random_cell_value(generator=generator, depth=depth-1) for i in range(generator.randint(0, 3))]
+	if kind == 'list':
+		return items
+	if kind == 'tuple':
+		return tuple(items)
+	return dict(zip([generator.choice(['Critical', 'uri', 'path', 'x', 'details']) for item in items], items))
+
+
+#
+#
+#	check_render
+#
+#		compare make_me_pretty.safe_to_write_string against safe_to_write_string_reference on random cell values
+#
+#		returns:
+#			list of inputs that produced different output ([] == all good)
+#
+#
+def check_render(count, seed=0):
+	mismatches = []
+	generator = random.Random(seed)
+	for i in range(count):
+		contents = random_cell_value(generator=generator)
+		if not make_me_pretty.safe_to_write_string(contents=contents) == safe_to_write_string_reference(contents):
+			mismatches.append(contents)
+	return mismatches
+
+
+#
+#
+#	render_rows
+#
+#		worksheet rows shaped like breathmint output: a few issue types (shared Background/Remediation/References text)
+#		over many targets, with a unique Issue Details per row
+#
+#
+def render_rows(count, seed=0):
+	generator = random.Random(seed)
+	issue_types = []
+	for i in range(25):
+		issue_types.append({
+			'Vulnerability Name':"Issue type " + str(i),
+			'Background':"<p>Background for issue type " + str(i) + " with <b>markup</b> &amp; entities.</p>" * 6,
+			'Remediation':"<p>Remediation  for \n issue type " + str(i) + " :</p><ul><li>step one</li><li>step two</li></ul>",
+			'References':tuple("https://example.org/reference/" + str(i) + "/" + str(j) for j in range(4)),
+			'Classification':("https://cwe.mitre.org/data/definitions/" + str(100+i) + ".html",),
+			'Risk':generator.choice(list(excelsify.SORT_ORDER_RISK.keys())),
+			'Confidence':generator.choice(["Certain", "Firm", "Tentative"])})
+	rows = []
+	for i in range(count):
+		row = dict(generator.choice(issue_types))
+		row['URI'] = "https://host" + str(i % 200) + ".example.org"
+		row['Path'] = "/app/" + str(i) + "/page"
+		row['Location'] = ""
+		row['Target Details'] = ["detail " + str(i), "<b>item</b> " + ''.join(generator.choice(string.ascii_letters) for j in range(20))]
+		row['Issue Details'] = "The parameter <b>p" + str(i) + "</b> appears to be vulnerable;  payload:  " + ''.join(generator.choice(string.ascii_letters) for j in range(60))
+		rows.append(row)
+	return rows
+
+
+#
+#
+#	bench_render
+#
+#		cells per second for the original per-cell chain, the excelsify render plan, and a whole create_workbook call
+#
+#		returns:
+#			{'cells':<<n>>, 'reference_cells_per_second':<<r>>, 'render_plan_cells_per_second':<<r>>, 'create_workbook_cells_per_second':<<r>>}
+#
+#
+def bench_render(rows):
+	row_data = render_rows(count=rows)
+	cells = rows * len(RENDER_COLUMN_NAMES)
+	start = time.perf_counter()
+	reference_cells = [render_cell_reference(column_name, row[column_name]) for row in row_data for column_name in RENDER_COLUMN_NAMES]
+	reference_seconds = time.perf_counter() - start
+	worksheet_data = {'Burp Issues':excelsify.create_worksheet_data(output_column_names=RENDER_COLUMN_NAMES, issue_data_list=row_data)}
+	start = time.perf_counter()
+	render_plan = excelsify.create_render_plan(column_data=worksheet_data['Burp Issues']['column_data'])
+	plan_cells = []
+	for row in worksheet_data['Burp Issues']['row_data']:
+		for column_name,cell_value in row.items():
+			plan_cells.append(render_plan[column_name]['renderers'].get(type(cell_value), excelsify.render_cell)(cell_value))
+	render_plan_seconds = time.perf_counter() - start
+	if not [safe_string for cell_font,safe_string in reference_cells] == plan_cells:
+		print("WARNING: the render plan output differs from the original per-cell chain")
+	with tempfile.TemporaryDirectory() as temp_dir:
+		start = time.perf_counter()
+		excelsify.create_workbook(worksheet_data=worksheet_data, out_filename=os.path.join(temp_dir, "bench.xlsx"))
+		create_workbook_seconds = time.perf_counter() - start
+	return {'cells':cells, 'reference_cells_per_second':cells / reference_seconds, 'render_plan_cells_per_second':cells / render_plan_seconds, 'create_workbook_cells_per_second':cells / create_workbook_seconds}
+
+
+#
+#
+#	time_repeated
+#
+#		best wall time (seconds) of repeat runs of iterations calls to function(contents)
+#
+#
+def time_repeated(function, contents, iterations, repeat=3):
+	def run_iterations(contents):
+		for i in range(iterations):
+			function(contents)
+	return time_call(run_iterations, contents, repeat=repeat)
+
+
+#
+#
+#	markup_reference
+#
+#		the BeautifulSoup path of make_me_pretty.remove_lxml_markup, without the fast path
+#
+#
+def markup_reference(contents):
+	return BeautifulSoup(contents, "lxml").text
+
+
+#
+#
+#	bench_markup
+#
+#		compare make_me_pretty.strip_markup_fast with the BeautifulSoup path on each MARKUP_CORPUS input, and time
+#			make_me_pretty.remove_lxml_markup (fast path, falling back to BeautifulSoup) against the BeautifulSoup path alone
+#
+#		returns:
+#			[{'input':"<<name>>", 'fast_path':True|False, 'match':True|False, 'fast':"<<text>>"|None, 'reference':"<<text>>",
+#				'current_seconds':<<t>>, 'reference_seconds':<<t>>}, ...]
+#			fast_path is False when strip_markup_fast returned None (the input falls back to BeautifulSoup, which always matches)
+#
+#
+def bench_markup(iterations, corpus=MARKUP_CORPUS):
+	results = []
+	for name,contents in corpus:
+		fast = make_me_pretty.strip_markup_fast(contents)
+		reference = markup_reference(contents)
+		current_seconds = time_repeated(make_me_pretty.remove_lxml_markup, contents, iterations=iterations)
+		reference_seconds = time_repeated(markup_reference, contents, iterations=iterations)
+		results.append({'input':name, 'fast_path':(not fast == None), 'match':(fast == None or fast == reference), 'fast':fast, 'reference':reference, 'current_seconds':current_seconds, 'reference_seconds':reference_seconds})
+	return results
+
+
+#
+#
+#	synthetic_html
+#
+#		random Burp style HTML text: <p> paragraphs (and now and then a <ul> list) of SYNTHETIC_WORDS
+#
+#		parameters:
+#			markup_density - 0..1 chance of each word being wrapped in an inline tag (or followed by an entity)
+#			whitespace_noise - 0..1 chance of each word being followed by a run of spaces/tabs/newlines instead of one space
+#
+#
+def synthetic_html(generator, word_count, markup_density, whitespace_noise):
+	paragraphs = []
+	words = []
+	for i in range(word_count):
+		word = generator.choice(SYNTHETIC_WORDS)
+		if generator.random() < markup_density:
+			if generator.random() < 0.8:
+				tag = generator.choice(SYNTHETIC_INLINE_TAGS)
+				word = "<" + tag + ">" + word + "</" + tag + ">"
+			else:
+				word = word + " &amp;"
+		words.append(word)
+		if generator.random() < whitespace_noise:
+			words.append(''.join(generator.choice(" \t\n") for j in range(generator.randint(2, 8))))
+		else:
+			words.append(" ")
+		if (len(words) >= 40 or i == word_count - 1):
+			text = ''.join(words).strip()
+			if generator.random() < markup_density / 2:
+				#	split into list items at ';', but not at the ';' of an &amp; entity or of a word inside an inline tag
+				paragraphs.append("<ul>\n" + "".join("  <li>" + item.strip() + "</li>\n" for item in re.split(r'(?<!&amp);(?!</)', text) if not item.strip() == "") + "</ul>")
+			else:
+				paragraphs.append("<p>" + text + "</p>")
+			words = []
+	return "\n".join(paragraphs)
+
+
+#
+#
+#	synthetic_issue_types
+#
+#		issue_types distinct issue types (name, background, remediation, references, classification);
+#		the issues of one type share this text, like the issues of one type in a real Burp export
+#
+#
+def synthetic_issue_types(generator, issue_types, markup_density, whitespace_noise):
+	retval = []
+	for i in range(issue_types):
+		references = "<ul>\n" + "".join('<li><a href="https://example.org/reference/' + str(i) + '/' + str(j) + '">Reference ' + str(j) + ' for issue type ' + str(i) + '</a></li>\n' for j in range(generator.randint(1, 5))) + "</ul>"
+		classification = '<ul>\n<li><a href="https://cwe.mitre.org/data/definitions/' + str(100 + i) + '.html">CWE-' + str(100 + i) + ': Synthetic weakness ' + str(i) + '</a></li>\n</ul>'
+		retval.append({
+			'name':"Synthetic issue type " + str(i),
+			'type':str(5245344 + i),
+			'background':synthetic_html(generator=generator, word_count=generator.randint(60, 200), markup_density=markup_density, whitespace_noise=whitespace_noise),
+			'remediation':synthetic_html(generator=generator, word_count=generator.randint(30, 120), markup_density=markup_density, whitespace_noise=whitespace_noise),
+			'references':references,
+			'classification':classification})
+	return retval
+
+
+#
+#
+#	synthetic_issues
+#
+#		generator of issue_count random issues (dicts of the raw text that goes into each <issue> element)
+#
+#		parameters:
+#			issue_count - number of issues
+#			issue_types - number of distinct issue types
+#			markup_density, whitespace_noise - see synthetic_html
+#			payload_size - bytes of response body per request/response pair
+#			seed - random seed; the same parameters and seed always give the same issues
+#
+#
+def synthetic_issues(issue_count, issue_types=SYNTHETIC_ISSUE_TYPES_DEFAULT, markup_density=SYNTHETIC_MARKUP_DEFAULT, whitespace_noise=SYNTHETIC_WHITESPACE_DEFAULT, payload_size=SYNTHETIC_PAYLOAD_DEFAULT, seed=0):
+	generator = random.Random(seed)
+	type_list = synthetic_issue_types(generator=generator, issue_types=max(1, issue_types), markup_density=markup_density, whitespace_noise=whitespace_noise)
+	for i in range(issue_count):
+		issue_type = generator.choice(type_list)
+		host_number = generator.randint(0, 255)
+		path = "/app/" + str(generator.randint(0, 999)) + "/" + generator.choice(["login", "search", "account", "api/v1/items"])
+		request = "GET " + path + "?q=" + str(i) + " HTTP/1.1\r\nHost: host" + str(host_number) + ".example.org\r\nCookie: session=" + str(i) + "\r\n\r\n"
+		body_chunk = ''.join(generator.choice(string.ascii_letters) for j in range(64))
+		response = "HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n" + (body_chunk * (payload_size // 64 + 1))[:payload_size]
+		yield {
+			'serial_number':str(1000000 + i),
+			'type':issue_type['type'],
+			'name':issue_type['name'],
+			'host':"https://host" + str(host_number) + ".example.org",
+			'ip':"10.0." + str(host_number // 16) + "." + str(host_number % 16),
+			'path':path,
+			'location':path + generator.choice(["", " [q parameter]", " [session cookie]"]),
+			'severity':generator.choice(SYNTHETIC_SEVERITIES),
+			'confidence':generator.choice(SYNTHETIC_CONFIDENCES),
+			'background':issue_type['background'],
+			'remediation':issue_type['remediation'],
+			'references':issue_type['references'],
+			'classification':issue_type['classification'],
+			'issue_detail':synthetic_html(generator=generator, word_count=generator.randint(10, 60), markup_density=markup_density, whitespace_noise=whitespace_noise),
+			'issue_detail_items':["https://host" + str(host_number) + ".example.org" + path, "item <i>" + str(i) + "</i>"],
+			'request':base64.b64encode(request.encode()).decode(),
+			'response':base64.b64encode(response.encode()).decode()}
+
+
+#
+#
+#	write_burp_xml
+#
+#		write issues (see synthetic_issues) to out_file as a Burp issues XML export, one issue at a time
+#
+#		returns:
+#			number of issues written
+#
+#
+def write_burp_xml(out_file, issues):
+	issue_count = 0
+	with open(out_file, 'w', encoding='utf-8') as f:
+		f.write('<?xml version="1.0"?>\n<!DOCTYPE issues [\n<!ELEMENT issues (issue*)>\n<!ATTLIST issues burpVersion CDATA "">\n<!ATTLIST issues exportTime CDATA "">\n]>\n')
+		f.write('<issues burpVersion="2023.1" exportTime="Mon Jan 01 00:00:00 UTC 2023">\n')
+		for issue in issues:
+			f.write("  <issue>\n")
+			f.write("    <serialNumber>" + issue['serial_number'] + "</serialNumber>\n")
+			f.write("    <type>" + issue['type'] + "</type>\n")
+			f.write("    <name>" + issue['name'] + "</name>\n")
+			f.write('    <host ip="' + issue['ip'] + '">' + issue['host'] + "</host>\n")
+			f.write("    <path><![CDATA[" + issue['path'] + "]]></path>\n")
+			f.write("    <location><![CDATA[" + issue['location'] + "]]></location>\n")
+			f.write("    <severity>" + issue['severity'] + "</severity>\n")
+			f.write("    <confidence>" + issue['confidence'] + "</confidence>\n")
+			f.write("    <issueBackground><![CDATA[" + issue['background'] + "]]></issueBackground>\n")
+			f.write("    <remediationBackground><![CDATA[" + issue['remediation'] + "]]></remediationBackground>\n")
+			f.write("    <references><![CDATA[" + issue['references'] + "]]></references>\n")
+			f.write("    <vulnerabilityClassifications><![CDATA[" + issue['classification'] + "]]></vulnerabilityClassifications>\n")
+			f.write("    <issueDetail><![CDATA[" + issue['issue_detail'] + "]]></issueDetail>\n")
+			f.write("    <issueDetailItems>" + "".join("<issueDetailItem><![CDATA[" + item + "]]></issueDetailItem>" for item in issue['issue_detail_items']) + "</issueDetailItems>\n")
+			f.write('    <requestresponse><request method="GET" base64="true"><![CDATA[' + issue['request'] + ']]></request><response base64="true"><![CDATA[' + issue['response'] + ']]></response><responseRedirected>false</responseRedirected></requestresponse>\n')
+			f.write("  </issue>\n")
+			issue_count += 1
+		f.write("</issues>\n")
+	return issue_count
+
+
+#
+#
+#	measure
+#
+#		run function() repeat times for the best wall time, then once more under tracemalloc for the peak memory
+#		(timing and tracing are separate runs because tracemalloc slows allocation-heavy code down a lot)
+#		only memory allocated by this process is seen, so worker processes ('-j') are not included in the peak
+#
+#		returns:
+#			(best_seconds, peak_memory_bytes)
+#
+#
+def measure(function, repeat=1, before=None):
+	best = None
+	for i in range(max(1, repeat)):
+		if not before == None:
+			before()
+		start = time.perf_counter()
+		function()
+		elapsed = time.perf_counter() - start
+		if (best == None or elapsed < best):
+			best = elapsed
+	if not before == None:
+		before()
+	tracemalloc.start()
+	try:
+		function()
+		peak = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+	return (best, peak)
+
+
+#
+#
+#	clear_parse_caches
+#
+#		empty breathmint's text caches so every parse_files run starts cold
+#
+#
+def clear_parse_caches():
+	breathmint.normalize_text.cache_clear()
+	breathmint.extract_atags.cache_clear()
+	breathmint.reference_urls.cache_clear()
+
+
+#
+#
+#	suite_result
+#
+#		one result row of bench_suite
+#
+#
+def suite_result(benchmark, scale, items, item_name, input_bytes, seconds, peak_memory_bytes):
+	return {
+		'benchmark':benchmark,
+		'scale':scale,
+		'items':items,
+		'item_name':item_name,
+		'input_bytes':input_bytes,
+		'seconds':seconds,
+		'items_per_second':items / max(seconds, 1e-9),
+		'megabytes_per_second':(None if input_bytes == None else input_bytes / 1048576 / max(seconds, 1e-9)),
+		'peak_memory_bytes':peak_memory_bytes}
+
+
+#
+#
+#	bench_suite
+#
+#		for each scale (number of issues): generate a synthetic Burp export and measure (see measure)
+#			parse_files - the whole export; again as 'parse_files (lxml)' with the lxml parser backend when lxml is installed
+#				(a warning is printed if the two backends do not give the same issue records)
+#			remove_lxml_markup, fix_spacing_issues - every Background, Remediation and Issue Details text
+#				the remove_lxml_markup result also has 'fast_path_rate' (share of the strings strip_markup_fast handles) and
+#				'mismatches' (distinct strings where strip_markup_fast and BeautifulSoup give different text; should be 0)
+#			extract_atags - every References and Classification text, without its cache (so every block is really parsed)
+#			create_workbook - the parsed issues, with the default breathmint columns
+#
+#		returns:
+#			list of suite_result dicts
+#
+#
+def bench_suite(scales, issue_types=SYNTHETIC_ISSUE_TYPES_DEFAULT, markup_density=SYNTHETIC_MARKUP_DEFAULT, whitespace_noise=SYNTHETIC_WHITESPACE_DEFAULT, payload_size=SYNTHETIC_PAYLOAD_DEFAULT, jobs=1, repeat=1, seed=0):
+	results = []
+	output_column_names = ["Vulnerability Name", "Background", "Remediation", "References", "Classification", "Risk", "Confidence", "URI", "Path", "Location", "Target Details", "Issue Details"]
+	with tempfile.TemporaryDirectory() as temp_dir, open(os.devnull, 'w') as devnull:
+		for scale in scales:
+			xml_file = os.path.join(temp_dir, "synthetic-" + str(scale) + ".xml")
+			markup_texts = []
+			atag_texts = []
+			for issue in synthetic_issues(issue_count=scale, issue_types=issue_types, markup_density=markup_density, whitespace_noise=whitespace_noise, payload_size=payload_size, seed=seed):
+				markup_texts.extend([issue['background'], issue['remediation'], issue['issue_detail']])
+				atag_texts.extend([issue['references'], issue['classification']])
+			write_burp_xml(out_file=xml_file, issues=synthetic_issues(issue_count=scale, issue_types=issue_types, markup_density=markup_density, whitespace_noise=whitespace_noise, payload_size=payload_size, seed=seed))
+			print("Scale", scale, "issues:", os.path.getsize(xml_file), "bytes of Burp XML")
+			parsed = []
+			def run_parse_files():
+				with contextlib.redirect_stdout(devnull):
+					parsed[:] = breathmint.parse_files(file_list=[xml_file], jobs=jobs)
+			seconds, peak = measure(function=run_parse_files, repeat=repeat, before=clear_parse_caches)
+			results.append(suite_result(benchmark="parse_files", scale=scale, items=len(parsed), item_name="issues", input_bytes=os.path.getsize(xml_file), seconds=seconds, peak_memory_bytes=peak))
+			if not breathmint.lxml == None:
+				parsed_lxml = []
+				def run_parse_files_lxml():
+					with contextlib.redirect_stdout(devnull):
+						parsed_lxml[:] = breathmint.parse_files(file_list=[xml_file], jobs=jobs, parser='lxml')
+				seconds, peak = measure(function=run_parse_files_lxml, repeat=repeat, before=clear_parse_caches)
+				results.append(suite_result(benchmark="parse_files (lxml)", scale=scale, items=len(parsed_lxml), item_name="issues", input_bytes=os.path.getsize(xml_file), seconds=seconds, peak_memory_bytes=peak))
+				if not [issue.to_record() for issue in parsed_lxml] == [issue.to_record() for issue in parsed]:
+					print("Warning: the lxml parser backend gave different issue records than etree at scale", scale)
+			markup_bytes = sum(len(text) for text in markup_texts)
+			seconds, peak = measure(function=lambda: [make_me_pretty.remove_lxml_markup(contents=text) for text in markup_texts], repeat=repeat)
+			result = suite_result(benchmark="remove_lxml_markup", scale=scale, items=len(markup_texts), item_name="strings", input_bytes=markup_bytes, seconds=seconds, peak_memory_bytes=peak)
+			fast_texts = {}
+			for text in set(markup_texts):
+				fast_texts[text] = make_me_pretty.strip_markup_fast(text)
+			result['fast_path_rate'] = len([text for text in markup_texts if not fast_texts[text] == None]) / max(len(markup_texts), 1)
+			result['mismatches'] = len([text for text,fast in fast_texts.items() if not (fast == None or fast == markup_reference(text))])
+			if result['mismatches'] > 0:
+				print("ERROR: strip_markup_fast and BeautifulSoup gave different text for", result['mismatches'], "synthetic strings at scale", scale)
+			results.append(result)
+			seconds, peak = measure(function=lambda: [make_me_pretty.fix_spacing_issues(contents=text) for text in markup_texts], repeat=repeat)
+			results.append(suite_result(benchmark="fix_spacing_issues", scale=scale, items=len(markup_texts), item_name="strings", input_bytes=markup_bytes, seconds=seconds, peak_memory_bytes=peak))
+			seconds, peak = measure(function=lambda: [breathmint.extract_atags.__wrapped__(html_string=text) for text in atag_texts], repeat=repeat)
+			results.append(suite_result(benchmark="extract_atags", scale=scale, items=len(atag_texts), item_name="strings", input_bytes=sum(len(text) for text in atag_texts), seconds=seconds, peak_memory_bytes=peak))
+			worksheet_data = {'Burp Issues':excelsify.create_worksheet_data(output_column_names=output_column_names, issue_data_list=parsed, normalized_column_names=breathmint.NORMALIZED_ISSUE_FIELDS)}
+			workbook_file = os.path.join(temp_dir, "synthetic-" + str(scale) + ".xlsx")
+			def run_create_workbook():
+				with contextlib.redirect_stdout(devnull):
+					excelsify.create_workbook(worksheet_data=worksheet_data, out_filename=workbook_file)
+			seconds, peak = measure(function=run_create_workbook, repeat=repeat)
+			results.append(suite_result(benchmark="create_workbook", scale=scale, items=len(parsed), item_name="rows", input_bytes=None, seconds=seconds, peak_memory_bytes=peak))
+	return results
+
+
+#
+#
+# -- Main program execution --
+#
+#
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser()
+	subparsers = parser.add_subparsers(dest="benchmark")
+	fix_spacing_parser = subparsers.add_parser("fix_spacing", help="Compare make_me_pretty.fix_spacing_issues against the original loop based version.")
+	fix_spacing_parser.add_argument("--sizes", default=FIX_SPACING_SIZES_DEFAULT, help="Comma separated list of input sizes (default == " + FIX_SPACING_SIZES_DEFAULT + ").")
+	fix_spacing_parser.add_argument("--check", type=int, default=FIX_SPACING_CHECK_DEFAULT, help="Number of random strings to compare against the original version before timing (default == " + str(FIX_SPACING_CHECK_DEFAULT) + ").")
+	render_parser = subparsers.add_parser("render", help="Cells per second for the workbook cell rendering (original per-cell chain vs. the excelsify render plan).")
+	render_parser.add_argument("--rows", type=int, default=RENDER_ROWS_DEFAULT, help="Number of worksheet rows (default == " + str(RENDER_ROWS_DEFAULT) + ").")
+	render_parser.add_argument("--check", type=int, default=RENDER_CHECK_DEFAULT, help="Number of random cell values to compare against the original safe_to_write_string before timing (default == " + str(RENDER_CHECK_DEFAULT) + ").")
+	markup_parser = subparsers.add_parser("markup", help="Compare make_me_pretty.strip_markup_fast with the BeautifulSoup path on a corpus of tricky HTML (entities, CDATA, comments, unclosed tags, <script>, ...), then time both.")
+	markup_parser.add_argument("--iterations", type=int, default=MARKUP_ITERATIONS_DEFAULT, help="Calls per input in each timed run (default == " + str(MARKUP_ITERATIONS_DEFAULT) + ").")
+	generate_parser = subparsers.add_parser("generate", help="Write a synthetic Burp issues XML export.")
+	generate_parser.add_argument("-o", required=True, help="Output XML file.")
+	generate_parser.add_argument("--issues", type=int, default=SYNTHETIC_ISSUES_DEFAULT, help="Number of issues (default == " + str(SYNTHETIC_ISSUES_DEFAULT) + ").")
+	suite_parser = subparsers.add_parser("suite", help="Throughput and peak memory of parse_files (etree and, if installed, lxml parser backends), remove_lxml_markup, fix_spacing_issues, extract_atags and create_workbook on synthetic exports of several sizes.")
+	suite_parser.add_argument("--scales", default=SUITE_SCALES_DEFAULT, help="Comma separated list of issue counts (default == " + SUITE_SCALES_DEFAULT + ").")
+	suite_parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes for parse_files (default == 1; worker memory is not included in the peak).")
+	suite_parser.add_argument("--repeat", type=int, default=1, help="Timed runs per benchmark; the best time is reported (default == 1).")
+	suite_parser.add_argument("--json", help="Results file (default == breathmint_bench--suite--<YYYYMMDD_HHMM>.json).")
+	for synthetic_parser in [generate_parser, suite_parser]:
+		synthetic_parser.add_argument("--issue-types", type=int, default=SYNTHETIC_ISSUE_TYPES_DEFAULT, help="Number of distinct issue types (default == " + str(SYNTHETIC_ISSUE_TYPES_DEFAULT) + ").")
+		synthetic_parser.add_argument("--markup", type=float, default=SYNTHETIC_MARKUP_DEFAULT, help="Markup density, 0..1 (default == " + str(SYNTHETIC_MARKUP_DEFAULT) + ").")
+		synthetic_parser.add_argument("--whitespace", type=float, default=SYNTHETIC_WHITESPACE_DEFAULT, help="Whitespace noise, 0..1 (default == " + str(SYNTHETIC_WHITESPACE_DEFAULT) + ").")
+		synthetic_parser.add_argument("--payload", type=int, default=SYNTHETIC_PAYLOAD_DEFAULT, help="Response body bytes per request/response pair (default == " + str(SYNTHETIC_PAYLOAD_DEFAULT) + ").")
+		synthetic_parser.add_argument("--seed", type=int, default=0, help="Random seed (default == 0).")
+	args = parser.parse_args()
+
+	try:
+		if args.benchmark == "fix_spacing":
+			mismatches = check_fix_spacing(count=args.check)
+			print("Equivalence check:", args.check, "random inputs,", len(mismatches), "mismatches")
+			for contents in mismatches[:10]:
+				print("  mismatch:", repr(contents))
+			print("{:<22} {:>9} {:>14} {:>14} {:>9}".format("input", "size", "reference (s)", "current (s)", "speedup"))
+			results = bench_fix_spacing(sizes=[int(size) for size in args.sizes.split(',')])
+			for result in results:
+				speedup = result['reference_seconds'] / max(result['current_seconds'], 1e-9)
+				print("{:<22} {:>9} {:>14.6f} {:>14.6f} {:>8.1f}x".format(result['input'], result['size'], result['reference_seconds'], result['current_seconds'], speedup))
+			if (not mismatches == [] or False in [result['match'] for result in results]):
+				print("ERROR: fix_spacing_issues does not match the original loop based version (see above)")
+				sys.exit(1)
+		elif args.benchmark == "render":
+			mismatches = check_render(count=args.check)
+			print("Equivalence check:", args.check, "random cell values,", len(mismatches), "mismatches")
+			for contents in mismatches[:10]:
+				print("  mismatch:", repr(contents))
+			result = bench_render(rows=args.rows)
+			print("{:<28} {:>14}".format("renderer", "cells/second"))
+			print("{:<28} {:>14.0f}".format("original per-cell chain", result['reference_cells_per_second']))
+			print("{:<28} {:>14.0f}".format("render plan", result['render_plan_cells_per_second']))
+			print("{:<28} {:>14.0f}".format("create_workbook (total)", result['create_workbook_cells_per_second']))
+		elif args.benchmark == "markup":
+			results = bench_markup(iterations=args.iterations)
+			mismatches = [result for result in results if result['match'] == False]
+			print("Equivalence check:", len(results), "corpus inputs,", len([result for result in results if result['fast_path'] == True]), "on the fast path,", len(mismatches), "mismatches")
+			for result in mismatches:
+				print("  mismatch:", result['input'], "fast:", repr(result['fast']), "BeautifulSoup:", repr(result['reference']))
+			print("{:<28} {:>9} {:>17} {:>14} {:>9}".format("input", "fast path", "BeautifulSoup (s)", "current (s)", "speedup"))
+			for result in results:
+				speedup = result['reference_seconds'] / max(result['current_seconds'], 1e-9)
+				print("{:<28} {:>9} {:>17.6f} {:>14.6f} {:>8.1f}x".format(result['input'], "yes" if result['fast_path'] == True else "fallback", result['reference_seconds'], result['current_seconds'], speedup))
+			if not mismatches == []:
+				print("ERROR: strip_markup_fast does not match BeautifulSoup on", len(mismatches), "corpus inputs (see above)")
+				sys.exit(1)
+		elif args.benchmark == "generate":
+			issue_count = write_burp_xml(out_file=args.o, issues=synthetic_issues(issue_count=args.issues, issue_types=args.issue_types, markup_density=args.markup, whitespace_noise=args.whitespace, payload_size=args.payload, seed=args.seed))
+			print("Wrote", issue_count, "issues to", args.o, "(" + str(os.path.getsize(args.o)) + " bytes)")
+		elif args.benchmark == "suite":
+			started = datetime.datetime.now()
+			parameters = {'scales':[int(scale) for scale in args.scales.split(',')], 'issue_types':args.issue_types, 'markup_density':args.markup, 'whitespace_noise':args.whitespace, 'payload_size':args.payload, 'jobs':args.jobs, 'repeat':args.repeat, 'seed':args.seed}
+			results = bench_suite(scales=parameters['scales'], issue_types=args.issue_types, markup_density=args.markup, whitespace_noise=args.whitespace, payload_size=args.payload, jobs=args.jobs, repeat=args.repeat, seed=args.seed)
+			print("{:<28} {:>9} {:>14} {:>10} {:>12} {:>10}".format("benchmark", "scale", "items/second", "MB/second", "peak (MiB)", "fast path"))
+			for result in results:
+				megabytes_per_second = "-" if result['megabytes_per_second'] == None else "{:.2f}".format(result['megabytes_per_second'])
+				fast_path_rate = "-" if result.get('fast_path_rate') == None else "{:.1%}".format(result['fast_path_rate'])
+				print("{:<28} {:>9} {:>14.0f} {:>10} {:>12.1f} {:>10}".format(result['benchmark'], result['scale'], result['items_per_second'], megabytes_per_second, result['peak_memory_bytes'] / 1048576, fast_path_rate))
+			json_file = args.json
+			if json_file == None:
+				json_file = "breathmint_bench--suite--" + started.strftime('%Y%m%d_%H%M') + ".json"
+			with open(json_file, 'w') as f:
+				json.dump({'started':started.isoformat(), 'python':sys.version, 'platform':platform.platform(), 'cpu_count':os.cpu_count(), 'parameters':parameters, 'results':results}, f, indent=2)
+			print("Results written to:", json_file)
+			if sum(result.get('mismatches', 0) for result in results) > 0:
+				print("ERROR: strip_markup_fast does not match BeautifulSoup on some synthetic strings (see above)")
+				sys.exit(1)
+		else:
+			parser.print_help()
+	except Exception as e:
+		print("===================")
+		print("\nERROR: breathmint_bench.__main__: Exception thrown in main execution:")
+		print(e)
+		traceback.print_exc()
+		print("===================")
+		sys.exit()
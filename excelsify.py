@@ -17,6 +17,7 @@ import datetime
 import traceback
 import sys
 import re
+import functools
 
 #
 #
@@ -24,6 +25,7 @@ import re
 #
 #
 import make_me_pretty
+import stopwatch
 
 #
 #
@@ -47,6 +49,8 @@ FONT_DEFAULT = 'left'
 FONT_SELECTION_BY_NAME = {}
 FONT_SELECTION_BY_NAME['center'] = ["URI", "IP", "Port", "Path", "Location", "Vulnerability Name", "Risk", "Severity", "Confidence"]
 FONT_SELECTION_BY_NAME['left'] = ["Target", "Background", "Remediation", "References", "Classification", "Target Details", "Issue Details"]
+#	rendered cells remembered per column by the render plan (repeated values such as Background and References are rendered once)
+RENDER_CACHE_SIZE = 1024
 
 #
 #
@@ -219,12 +223,13 @@ def prep_workbook(workbook):
 #							left as a placeholder in case more interesting things are added later
 #			column_content_length - dictionary with column names as keys and min/max length of the content dictionary as values
 #							min & max content length values used as input to determine_column_width function
+#			write_header - False if the header row was already written with write_worksheet_header
 #
 #		returns:
 #			worksheet_this
 #
 #
-def set_worksheet_formatting(worksheet_this, column_data, column_content_length):
+def set_worksheet_formatting(worksheet_this, column_data, column_content_length, write_header=True):
 	try:
 		for column_name,column_details in column_data.items():
 			column_width = determine_column_width(content_length_min=column_content_length[column_name]['min'], content_length_max=column_content_length[column_name]['max'])
@@ -235,7 +240,8 @@ def set_worksheet_formatting(worksheet_this, column_data, column_content_length)
 			if column_width < len(column_name):
 				column_width = len(column_name)
 			worksheet_this.set_column(column_details['column_number'], column_details['column_number'], column_width)
-			worksheet_this.write(0, column_details['column_number'], column_name, WB_FONTS['header'])
+			if write_header == True:
+				worksheet_this.write(0, column_details['column_number'], column_name, WB_FONTS['header'])
 		worksheet_this.freeze_panes(1, 0)
 	except Exception as e:
 		print("\n==== Exception ====\n  excelsify.set_worksheet_formatting()\n----")
@@ -245,6 +251,29 @@ def set_worksheet_formatting(worksheet_this, column_data, column_content_length)
 	return worksheet_this
 
 
+#
+#
+#	write_worksheet_header
+#
+#		write the header row of a results worksheet
+#		in constant_memory mode rows can only be written in order, so the header has to go out before any data row
+#
+#		returns:
+#			worksheet_this
+#
+#
+def write_worksheet_header(worksheet_this, column_data):
+	try:
+		for column_name,column_details in column_data.items():
+			worksheet_this.write(0, column_details['column_number'], column_name, WB_FONTS['header'])
+	except Exception as e:
+		print("\n==== Exception ====\n  excelsify.write_worksheet_header()\n----")
+		print(e)
+		traceback.print_exc()
+		print("\n===================")
+	return worksheet_this
+
+
 #
 #
 #	add_chart_worksheet
@@ -279,14 +308,15 @@ def add_chart_worksheet(workbook_this, worksheet_this, worksheet_name, issue_ris
 			worksheet_this.write_formula(row_num, 1, '=COUNTIF(B$21:B$' + str(num_issues+21) + ', ' + abs_cell_ref + ')', WB_FONTS['left'])
 		row_num += 1
 		#	total
+		#		(cells are written in row order so this also works in constant_memory mode)
 		worksheet_this.write(row_num, 0, "Total", WB_FONTS['total'])
-		worksheet_this.write(row_num+1, 0, "Total Open", WB_FONTS['total'])
 		abs_cell_ref_start = xl_rowcol_to_cell(1, 1)
 		abs_cell_ref_end = xl_rowcol_to_cell(row_num-1, 1)
 		abs_cell_ref_end_open = xl_rowcol_to_cell(row_num-2, 1)
 		worksheet_this.write_formula(row_num, 1, '=SUM(' + abs_cell_ref_start + ":" + abs_cell_ref_end + ')', WB_FONTS['total'])
 		#	total open
 		row_num += 1
+		worksheet_this.write(row_num, 0, "Total Open", WB_FONTS['total'])
 		worksheet_this.write_formula(row_num, 1, '=SUM(' + abs_cell_ref_start + ":" + abs_cell_ref_end_open + ')', WB_FONTS['total'])
 		#	write out risk rating for each issue starting in row 20 (headings) and row 21 (entries)
 		worksheet_this.write(20, 0, "ID", WB_FONTS['header'])
@@ -331,6 +361,58 @@ def add_chart_worksheet(workbook_this, worksheet_this, worksheet_name, issue_ris
 	return worksheet_this
 
 
+#
+#
+#	create_row_data
+#
+#		create the row data dictionary for one issue
+#
+#		parameters:
+#			output_column_names - see create_worksheet_data
+#			issue_data - issue data dictionary
+#
+#		returns:
+#			{'<<column name>>':<<cell value>>, ...}
+#
+#
+def create_row_data(output_column_names, issue_data):
+	new_row_data = {}
+	for column_name in output_column_names:
+		if not column_name in issue_data.keys():
+			print("excelsify.create_worksheet_data: column_name (" + column_name + ") is not a valid key in this issue_data dictionary:\n", issue_data)
+		elif column_name == 'Target':
+			#
+			#	example for handling a 'Target' dictionary with risk ratings as keys and each corresponding value being a list of target dictionaries
+			#		revise as needed depending on how you define an optional/added 'Target' field for each issue
+			#	could also use this as an example for handling other types of issue data storage
+			#	the lines are collected in a list (one join at the end) and targets are deduplicated with a set, so a
+			#	grouped row with many thousands of targets does not rescan/copy the whole cell for every target
+			target_pretty = """"""
+			if isinstance(issue_data[column_name], dict):
+				target_lines = []
+				seen_targets = set()
+				num_risk_ratings = len(issue_data[column_name].keys())
+				for risk_rating in SORT_ORDER_RISK_ORDERED:
+					if risk_rating in issue_data[column_name].keys():
+						if num_risk_ratings > 1:
+							target_lines.append(risk_rating + """\n""")
+						#
+						#	could add some logic here to change include_details to True based on certain data/requirements
+						for target_dict in issue_data[column_name][risk_rating]:
+							temp = make_me_pretty.target_pretty(target_dict=target_dict, include_details=False, details_separator="\n")
+							if not temp in seen_targets:
+								seen_targets.add(temp)
+								target_lines.append(temp + """\n""")
+				target_pretty = "".join(target_lines)
+			else:
+				print("\n\n\n excelsify.create_worksheet_data: uh, this probably should not happen \n\n\n")
+				target_pretty = str(issue_data[column_name])
+			new_row_data[column_name] = target_pretty
+		else:
+			new_row_data[column_name] = issue_data[column_name]
+	return new_row_data
+
+
 #
 #
 #	create_worksheet_data
@@ -341,46 +423,26 @@ def add_chart_worksheet(workbook_this, worksheet_this, worksheet_name, issue_ris
 #			output_column_names - list of column names to include in the desired worksheet
 #				column names must be keys in each issue data dictionary in issue_data_list
 #			issue_data_list - list of issue data dictionaries
+#				can also be any other iterable of issue data dictionaries (e.g. rows streamed from a database query);
+#				the rows are then created one at a time while create_workbook writes them, instead of all up front
+#			normalized_column_names - columns whose str values have already had their markup removed and their spacing fixed
+#				(see render_normalized_cell); leave empty for raw data from other tools
 #
 #		returns:
 #			worksheet_data dictionary that can be used as a parameter in the create_workbook function
 #
 #
-def create_worksheet_data(output_column_names, issue_data_list):
+def create_worksheet_data(output_column_names, issue_data_list, normalized_column_names=[]):
 	try:
 		excelsify_worksheet_data = {}
 		excelsify_worksheet_data['add_charts'] = True
-		excelsify_worksheet_data['row_data'] = []
-		for issue_data in issue_data_list:
-			new_row_data = {}
-			for column_name in output_column_names:
-				if not column_name in issue_data.keys():
-					print("excelsify.create_worksheet_data: column_name (" + column_name + ") is not a valid key in this issue_data dictionary:\n", issue_data)
-				elif column_name == 'Target':
-					#
-					#	example for handling a 'Target' dictionary with risk ratings as keys and each corresponding value being a list of target dictionaries
-					#		revise as needed depending on how you define an optional/added 'Target' field for each issue
-					#	could also use this as an example for handling other types of issue data storage
-					target_pretty = """"""
-					if isinstance(issue_data[column_name], dict):
-						num_risk_ratings = len(issue_data[column_name].keys())
-						for risk_rating in SORT_ORDER_RISK_ORDERED:
-							if risk_rating in issue_data[column_name].keys():
-								if num_risk_ratings > 1:
-									target_pretty += risk_rating + """\n"""
-								#
-								#	could add some logic here to change include_details to True based on certain data/requirements
-								for target_dict in issue_data[column_name][risk_rating]:
-									temp = make_me_pretty.target_pretty(target_dict=target_dict, include_details=False, details_separator="\n")
-									if not temp in target_pretty:
-										target_pretty += temp + """\n"""
-					else:
-						print("\n\n\n excelsify.create_worksheet_data: uh, this probably should not happen \n\n\n")
-						target_pretty = str(issue_data[column_name])
-					new_row_data[column_name] = target_pretty
-				else:
-					new_row_data[column_name] = issue_data[column_name]
-			excelsify_worksheet_data['row_data'].append(new_row_data)
+		excelsify_worksheet_data['normalized_column_names'] = list(normalized_column_names)
+		if isinstance(issue_data_list, list):
+			excelsify_worksheet_data['row_data'] = []
+			for issue_data in issue_data_list:
+				excelsify_worksheet_data['row_data'].append(create_row_data(output_column_names=output_column_names, issue_data=issue_data))
+		else:
+			excelsify_worksheet_data['row_data'] = (create_row_data(output_column_names=output_column_names, issue_data=issue_data) for issue_data in issue_data_list)
 		excelsify_worksheet_data['column_data'] = {}
 		column_number = 0
 		for column_name in output_column_names:
@@ -397,6 +459,95 @@ def create_worksheet_data(output_column_names, issue_data_list):
 		return {}
 
 
+#
+#
+#	render_cell
+#
+#		turn a cell value into the string written to the worksheet
+#
+#
+def render_cell(contents):
+	safe_string = make_me_pretty.safe_to_write_string(contents=contents)
+	safe_string = make_me_pretty.remove_lxml_markup(contents=safe_string)
+	safe_string = make_me_pretty.fix_spacing_issues(contents=safe_string)
+	if safe_string.endswith("""\n"""):
+		safe_string = safe_string[:-1]
+	return safe_string
+
+
+#
+#
+#	render_normalized_cell
+#
+#		render_cell for a str that the parser has already run through remove_lxml_markup (see create_worksheet_data)
+#		skips the remove_lxml_markup pass unless the text still has a '<' or '&' in it (e.g. decoded from &lt;script&gt;)
+#			or a control character, in which case the full render_cell is used; the result is the same as render_cell's
+#
+#
+def render_normalized_cell(contents):
+	safe_string = contents.lstrip(make_me_pretty.NO_START_PUNCTUATION_CHARACTERS).strip()
+	if ('<' in safe_string or '&' in safe_string or make_me_pretty.FAST_MARKUP_UNSAFE_PATTERN.search(safe_string)):
+		return render_cell(contents)
+	safe_string = make_me_pretty.fix_spacing_issues(contents=safe_string)
+	if safe_string.endswith("""\n"""):
+		safe_string = safe_string[:-1]
+	return safe_string
+
+
+#
+#
+#	render_request_response
+#
+#		'Request Response' cell: one "request: ..." / "response: ..." line per request/response pair
+#		(meant for evidence file paths; see breathmint.store_evidence)
+#
+#
+def render_request_response(contents):
+	lines = []
+	for key in sorted(contents.keys(), key=int):
+		for part in ['request', 'response']:
+			if not contents[key].get(part) == None:
+				lines.append(part + ": " + str(contents[key][part]))
+	return "\n".join(lines)
+
+
+#
+#
+#	create_render_plan
+#
+#		work out everything about a worksheet's columns that does not depend on the row, once, before the rows are written
+#
+#		parameters:
+#			column_data - see set_worksheet_formatting
+#			normalized_column_names - see create_worksheet_data; str values in these columns are rendered with render_normalized_cell
+#
+#		returns:
+#			{'<<column name>>':{'column_number':<<n>>, 'cell_format':<<workbook format>>, 'renderers':{<<value type>>:<<function>>, ...}}, ...}
+#				renderers has one entry per value type found in issue data (str (also used for 'Target'), tuple, list, dict)
+#				str and tuple values are rendered through a per-column lru_cache, so repeated values are only rendered once
+#
+#
+def create_render_plan(column_data, normalized_column_names=[]):
+	render_plan = {}
+	for column_name,column_details in column_data.items():
+		cached_render_cell = functools.lru_cache(maxsize=RENDER_CACHE_SIZE)(render_cell)
+		def render_hashable_cell(contents, cached_render_cell=cached_render_cell):
+			try:
+				return cached_render_cell(contents)
+			except TypeError:
+				#	a tuple holding lists or dicts
+				return render_cell(contents)
+		render_plan[column_name] = {}
+		render_plan[column_name]['column_number'] = column_details['column_number']
+		render_plan[column_name]['cell_format'] = WB_FONTS[determine_cell_font(field_name=column_name)]
+		render_plan[column_name]['renderers'] = {str:cached_render_cell, tuple:render_hashable_cell, list:render_cell, dict:render_cell}
+		if column_name in normalized_column_names:
+			render_plan[column_name]['renderers'][str] = functools.lru_cache(maxsize=RENDER_CACHE_SIZE)(render_normalized_cell)
+		if column_name == 'Request Response':
+			render_plan[column_name]['renderers'][dict] = render_request_response
+	return render_plan
+
+
 #
 #
 #	create_workbook
@@ -405,15 +556,18 @@ def create_worksheet_data(output_column_names, issue_data_list):
 #
 #		parameters:
 #			worksheet_data - output from the create_worksheet_data function
+#			constant_memory - True to stream each row to disk as soon as it is written (xlsxwriter 'constant_memory' mode)
+#				memory use stays flat no matter how many rows are written; rows have to be written in order, so the header
+#				goes out first and the column widths are set at the end from the content lengths collected while writing
 #
 #		returns:
 #			True|False
 #
 #
-def create_workbook(worksheet_data, out_filename=FILENAME_DEFAULT):
+def create_workbook(worksheet_data, out_filename=FILENAME_DEFAULT, constant_memory=False):
 	retval = False
 	try:
-		workbook = xlsxwriter.Workbook(out_filename, {'strings_to_urls': False})
+		workbook = xlsxwriter.Workbook(out_filename, {'strings_to_urls': False, 'constant_memory': constant_memory})
 		workbook = prep_workbook(workbook=workbook)
 		for worksheet_name in worksheet_data.keys():
 			column_content_length = {}
@@ -421,29 +575,30 @@ def create_workbook(worksheet_data, out_filename=FILENAME_DEFAULT):
 			worksheet_this = workbook.add_worksheet(worksheet_name)
 			for column_name in worksheet_data[worksheet_name]['column_data'].keys():
 				column_content_length[column_name] = {'min':COLUMN_WIDTH_START, 'max':COLUMN_WIDTH_START}
+			worksheet_this = write_worksheet_header(worksheet_this=worksheet_this, column_data=worksheet_data[worksheet_name]['column_data'])
+			render_plan = create_render_plan(column_data=worksheet_data[worksheet_name]['column_data'], normalized_column_names=worksheet_data[worksheet_name].get('normalized_column_names', []))
 			row_number = 1
 			for row in worksheet_data[worksheet_name]['row_data']:
 				for column_name,cell_value in row.items():
 					if column_name == "Risk":
 						issue_risk_rating_list.append(cell_value)
-					column_number = worksheet_data[worksheet_name]['column_data'][column_name]['column_number']
-					cell_font = determine_cell_font(field_name=column_name)
-					safe_string = make_me_pretty.safe_to_write_string(contents=cell_value)
-					safe_string = make_me_pretty.remove_lxml_markup(contents=safe_string)
-					safe_string = make_me_pretty.fix_spacing_issues(contents=safe_string)
-					if safe_string.endswith("""\n"""):
-						safe_string = safe_string[:-1]
+					column_plan = render_plan[column_name]
+					safe_string = column_plan['renderers'].get(type(cell_value), render_cell)(cell_value)
 					#	reference: ws.write(row_number, column_number, contents, cell_font)
-					worksheet_this.write(row_number, column_number, safe_string, WB_FONTS[cell_font])
-					column_content_length[column_name]['min'] = min(column_content_length[column_name]['min'], determine_content_length_min(content=safe_string))
-					column_content_length[column_name]['max'] = max(column_content_length[column_name]['max'], determine_content_length_max(content=safe_string))
+					worksheet_this.write(row_number, column_plan['column_number'], safe_string, column_plan['cell_format'])
+					content_length = column_content_length[column_name]
+					content_length['min'] = min(content_length['min'], len(safe_string))
+					content_length['max'] = max(content_length['max'], len(safe_string))
 				row_number += 1
-			worksheet_this = set_worksheet_formatting(worksheet_this=worksheet_this, column_data=worksheet_data[worksheet_name]['column_data'], column_content_length=column_content_length)
+			stopwatch.add_count(counter_name="rows written", value=row_number - 1)
+			stopwatch.add_count(counter_name="cells written", value=(row_number - 1) * len(render_plan))
+			worksheet_this = set_worksheet_formatting(worksheet_this=worksheet_this, column_data=worksheet_data[worksheet_name]['column_data'], column_content_length=column_content_length, write_header=False)
 			if worksheet_data[worksheet_name]['add_charts'] == True:
 				chart_worksheet_name = worksheet_name + " Charts"
 				chart_worksheet_this = workbook.add_worksheet(chart_worksheet_name)
 				chart_worksheet_this = add_chart_worksheet(workbook_this=workbook, worksheet_this=chart_worksheet_this, worksheet_name=chart_worksheet_name, issue_risk_rating_list=issue_risk_rating_list)
-		workbook.close()
+		with stopwatch.stage(stage_name="excelsify.create_workbook (xlsx close)"):
+			workbook.close()
 		retval = True
 	except Exception as e:
 		print("\n==== Exception ====\n  excelsify.create_workbook()\n----")
@@ -0,0 +1,241 @@
+#!/usr/bin/python3
+'''
+exportify
+	Write worksheet data (see excelsify.create_worksheet_data) to CSV, JSON Lines or Parquet files
+
+	rows are written as they come in, so row_data can be a generator (e.g. issues streamed from the issue database)
+	lists and request/response pairs keep their structure: JSON arrays/objects in JSON Lines and Parquet list/struct columns;
+	CSV has no types, so those cells hold the same values as JSON text
+'''
+
+#
+#
+# -- import public modules --
+#
+#
+import csv
+import json
+import traceback
+
+#
+#	pyarrow is only needed for Parquet output
+try:
+	import pyarrow
+	import pyarrow.parquet
+except ImportError:
+	pyarrow = None
+
+#
+#
+# -- import private modules --
+#
+#
+import stopwatch
+
+#
+#
+# -- Global variables --
+#
+#
+EXPORT_FORMATS = ["csv", "jsonl", "parquet"]
+#	rows per Parquet row group; also the number of rows held in memory while writing Parquet
+PARQUET_BATCH_SIZE = 10000
+#	Parquet column types (see parquet_column_type); every other column is a string column
+PARQUET_STRING_LIST_COLUMNS = ["References", "Classification", "Target Details"]
+
+#
+#
+# -- Function declarations --
+#
+#
+
+#
+#
+#	typed_value
+#
+#		plain (JSON/Arrow friendly) version of a cell value
+#			tuples become lists
+#			'Request Response' ({'0':{'request':..., 'response':...}, ...}) becomes [{'request':..., 'response':...}, ...]
+#				(both keys always present, None when missing)
+#
+#
+def typed_value(column_name, value):
+	if (type(value) is list or type(value) is tuple):
+		return [typed_value(column_name=None, value=item) for item in value]
+	if type(value) is dict:
+		if column_name == 'Request Response':
+			return [{'request':value[key].get('request'), 'response':value[key].get('response')} for key in sorted(value.keys(), key=int)]
+		retval = {}
+		for key,val in value.items():
+			retval[str(key)] = typed_value(column_name=None, value=val)
+		return retval
+	return value
+
+
+#
+#
+#	typed_rows
+#
+#		returns:
+#			generator of the rows of worksheet_data with typed_value applied to every cell, columns in column_number order
+#
+#
+def typed_rows(worksheet_data):
+	column_names = sorted(worksheet_data['column_data'].keys(), key=lambda k: worksheet_data['column_data'][k]['column_number'])
+	for row in worksheet_data['row_data']:
+		new_row = {}
+		for column_name in column_names:
+			new_row[column_name] = typed_value(column_name=column_name, value=row.get(column_name))
+		yield new_row
+
+
+#
+#
+#	write_csv
+#
+#		one header row, then one row per issue; structured values are written as JSON text
+#
+#		returns:
+#			number of rows written
+#
+#
+def write_csv(worksheet_data, out_filename):
+	row_count = 0
+	column_names = sorted(worksheet_data['column_data'].keys(), key=lambda k: worksheet_data['column_data'][k]['column_number'])
+	with open(out_filename, 'w', newline='', encoding='utf-8') as f:
+		writer = csv.writer(f)
+		writer.writerow(column_names)
+		for row in typed_rows(worksheet_data=worksheet_data):
+			csv_row = []
+			for column_name in column_names:
+				value = row[column_name]
+				if value == None:
+					value = ""
+				elif (type(value) is list or type(value) is dict):
+					value = json.dumps(value, ensure_ascii=False)
+				csv_row.append(value)
+			writer.writerow(csv_row)
+			row_count += 1
+	return row_count
+
+
+#
+#
+#	write_jsonl
+#
+#		one JSON object per line, one line per issue
+#
+#		returns:
+#			number of rows written
+#
+#
+def write_jsonl(worksheet_data, out_filename):
+	row_count = 0
+	with open(out_filename, 'w', encoding='utf-8') as f:
+		for row in typed_rows(worksheet_data=worksheet_data):
+			f.write(json.dumps(row, ensure_ascii=False) + "\n")
+			row_count += 1
+	return row_count
+
+
+#
+#
+#	parquet_column_type
+#
+#		Arrow type of a worksheet column; declared up front (never inferred from the data) so every row group of every file
+#		has the same schema, whatever values the first rows happen to hold
+#			References, Classification, Target Details - list<string>
+#			Request Response - list<struct<request:string, response:string>>
+#			anything else (including the 'Target' text of grouped rows) - string
+#
+#
+def parquet_column_type(column_name):
+	if column_name in PARQUET_STRING_LIST_COLUMNS:
+		return pyarrow.list_(pyarrow.string())
+	if column_name == 'Request Response':
+		return pyarrow.list_(pyarrow.struct([pyarrow.field('request', pyarrow.string()), pyarrow.field('response', pyarrow.string())]))
+	return pyarrow.string()
+
+
+#
+#
+#	parquet_schema
+#
+#		Arrow schema for the worksheet columns (see parquet_column_type)
+#
+#
+def parquet_schema(column_names):
+	return pyarrow.schema([pyarrow.field(column_name, parquet_column_type(column_name=column_name)) for column_name in column_names])
+
+
+#
+#
+#	write_parquet
+#
+#		columnar output; rows are written in row groups of PARQUET_BATCH_SIZE rows
+#
+#		returns:
+#			number of rows written
+#
+#
+def write_parquet(worksheet_data, out_filename):
+	row_count = 0
+	column_names = sorted(worksheet_data['column_data'].keys(), key=lambda k: worksheet_data['column_data'][k]['column_number'])
+	writer = None
+	batch = []
+	try:
+		writer = pyarrow.parquet.ParquetWriter(out_filename, parquet_schema(column_names=column_names))
+		for row in typed_rows(worksheet_data=worksheet_data):
+			batch.append(row)
+			if len(batch) >= PARQUET_BATCH_SIZE:
+				writer.write_table(pyarrow.Table.from_pylist(batch, schema=writer.schema))
+				row_count += len(batch)
+				batch = []
+		if not batch == []:
+			writer.write_table(pyarrow.Table.from_pylist(batch, schema=writer.schema))
+			row_count += len(batch)
+	finally:
+		if not writer == None:
+			writer.close()
+	return row_count
+
+
+#
+#
+#	export_worksheet
+#
+#		write one worksheet (output from excelsify.create_worksheet_data) to out_filename
+#
+#		parameters:
+#			worksheet_data - output from excelsify.create_worksheet_data
+#			out_filename - output file name
+#			out_format - one of EXPORT_FORMATS
+#
+#		returns:
+#			True|False
+#
+#
+def export_worksheet(worksheet_data, out_filename, out_format):
+	retval = False
+	try:
+		if out_format == "csv":
+			row_count = write_csv(worksheet_data=worksheet_data, out_filename=out_filename)
+		elif out_format == "jsonl":
+			row_count = write_jsonl(worksheet_data=worksheet_data, out_filename=out_filename)
+		elif out_format == "parquet":
+			if pyarrow == None:
+				print("ERROR: exportify.export_worksheet: Parquet output needs the pyarrow module (pip install pyarrow)")
+				return False
+			row_count = write_parquet(worksheet_data=worksheet_data, out_filename=out_filename)
+		else:
+			print("ERROR: exportify.export_worksheet: unknown output format:", out_format)
+			return False
+		print("Rows written:", row_count)
+		stopwatch.add_count(counter_name="rows written", value=row_count)
+		retval = True
+	except Exception as e:
+		print("\n==== Exception ====\n  exportify.export_worksheet()\n----")
+		print(e)
+		traceback.print_exc()
+		print("\n===================")
+	return retval
@@ -25,6 +25,32 @@ SORT_ORDER_RISK = {"Critical":0, "High":1, "Medium":2, "Low":3, "Informational":
 TARGET_DICT_KEYS = ["uri", "path", "details"]
 TARGET_DICT_KEY_LIST_ORDERED = ['Risk', 'FQDN', 'Protocol', 'Port', 'Path']
 NO_START_PUNCTUATION = set(string.punctuation) - {'/','<'}
+#	same characters as one string, for str.lstrip
+NO_START_PUNCTUATION_CHARACTERS = ''.join(sorted(NO_START_PUNCTUATION))
+#
+#	strip_markup_fast only handles the small, well-nested HTML subset Burp uses; anything else falls back to BeautifulSoup
+#	note: no <pre>/<textarea> (whitespace preserving) and no <table> (text can be moved around by the parser)
+FAST_MARKUP_BLOCK_TAGS = ['p', 'ul', 'ol', 'li', 'div']
+FAST_MARKUP_INLINE_TAGS = ['b', 'i', 'u', 'a', 'strong', 'em', 'span', 'code']
+FAST_MARKUP_VOID_TAGS = ['br']
+FAST_MARKUP_TAG_PATTERN = re.compile(r'<(/?)(' + '|'.join(FAST_MARKUP_VOID_TAGS + FAST_MARKUP_BLOCK_TAGS + FAST_MARKUP_INLINE_TAGS) + r')(?:\s+[^\s"\'<>/=]+(?:\s*=\s*(?:"[^"]*"|\'[^\']*\'|[^\s"\'<>=`]+))?)*\s*(/?)>', re.IGNORECASE)
+FAST_MARKUP_ENTITIES = {'amp':'&', 'lt':'<', 'gt':'>', 'quot':'"', 'nbsp':'\xa0'}
+FAST_MARKUP_ENTITY_PATTERN = re.compile(r'&(?:(' + '|'.join(FAST_MARKUP_ENTITIES.keys()) + r');|(?=[A-Za-z#]))')
+FAST_MARKUP_UNSAFE_PATTERN = re.compile(r'[\x00-\x08\x0b-\x1f]')
+#	whitespace as the HTML parser sees it (leading whitespace is dropped, whitespace-only text is collapsed)
+MARKUP_SPACES = ' \n\t'
+#
+#	fix_spacing_issues rules, in order: (find, replace with, regex that does all of the repeated find/replace passes at once)
+SPACING_RULES = []
+SPACING_RULES.append(('  ', ' ', re.compile(r' {2,}')))
+SPACING_RULES.append(('\n ', '\n', re.compile(r'\n +')))
+SPACING_RULES.append((' \n', '\n', re.compile(r' +\n')))
+SPACING_RULES.append((' \t', '\t', re.compile(r' +\t')))
+SPACING_RULES.append(('\t ', '\t', re.compile(r'\t +')))
+SPACING_RULES.append(('\n\n', '\n', re.compile(r'\n{2,}')))
+SPACING_RULES.append(('\t\t', '\t', re.compile(r'\t{2,}')))
+SPACING_RULES.append(('\t\n', '\n', re.compile(r'\t+\n')))
+SPACING_RULES.append(('\n;', ';', re.compile(r'\n+;')))
 
 #
 #
@@ -32,18 +58,126 @@ NO_START_PUNCTUATION = set(string.punctuation) - {'/','<'}
 #
 #
 
+#
+#
+#	strip_markup_text
+#
+#		helper for strip_markup_fast; handles the text between two tags
+#
+#		returns:
+#			the decoded text, or None if it contains something strip_markup_fast does not handle
+#
+#
+def strip_markup_text(text, is_first):
+	if '<' in text:
+		return None
+	if '&' in text:
+		for entity in FAST_MARKUP_ENTITY_PATTERN.finditer(text):
+			if entity.group(1) == None:
+				return None
+		text = FAST_MARKUP_ENTITY_PATTERN.sub(lambda entity: FAST_MARKUP_ENTITIES[entity.group(1)], text)
+	if is_first:
+		text = text.lstrip(MARKUP_SPACES)
+	elif (not text == '' and text.strip(MARKUP_SPACES) == ''):
+		#
+		#	BeautifulSoup replaces whitespace-only text with a single newline or space
+		if '\n' in text:
+			text = '\n'
+		else:
+			text = ' '
+	return text
+
+
+#
+#
+#	strip_markup_tag_is_simple
+#
+#		helper for strip_markup_fast; keeps track of the open tags and checks that the HTML parser has nothing to fix up
+#			(no stray or mismatched closing tags, no blocks inside <p> or inline tags, <li> only directly inside a list, ...)
+#
+#		parameters:
+#			tag - FAST_MARKUP_TAG_PATTERN match
+#			open_tags - list of the currently open tag names; updated in place
+#
+#		returns:
+#			True|False
+#
+#
+def strip_markup_tag_is_simple(tag, open_tags):
+	closing, name, self_closing = tag.group(1), tag.group(2).lower(), tag.group(3)
+	if name in FAST_MARKUP_VOID_TAGS:
+		return closing == ''
+	if not self_closing == '':
+		return False
+	if closing == '/':
+		if (len(open_tags) == 0 or not open_tags[-1] == name):
+			return False
+		open_tags.pop()
+		return True
+	if name in FAST_MARKUP_BLOCK_TAGS:
+		for open_tag in open_tags:
+			if (open_tag == 'p' or open_tag in FAST_MARKUP_INLINE_TAGS):
+				return False
+		if (name == 'li' and (len(open_tags) == 0 or not open_tags[-1] in ['ul', 'ol'])):
+			return False
+	elif (name == 'a' and 'a' in open_tags):
+		return False
+	open_tags.append(name)
+	return True
+
+
+#
+#
+#	strip_markup_fast
+#
+#		regex based equivalent of BeautifulSoup(contents, "lxml").text for the HTML subset found in Burp issues
+#			(<p>, <ul>, <li>, <b>, <a>, <br> etc, and the &amp; &lt; &gt; &quot; &nbsp; entities)
+#
+#		returns:
+#			the text content, or None if contents has anything outside that subset (comments, other tags, numeric entities, stray '<', ...)
+#
+#
+def strip_markup_fast(contents):
+	if not isinstance(contents, str):
+		return None
+	if FAST_MARKUP_UNSAFE_PATTERN.search(contents):
+		return None
+	if (not '<' in contents and not '&' in contents):
+		return contents.lstrip(MARKUP_SPACES)
+	pieces = []
+	open_tags = []
+	position = 0
+	for tag in FAST_MARKUP_TAG_PATTERN.finditer(contents):
+		if not strip_markup_tag_is_simple(tag=tag, open_tags=open_tags):
+			return None
+		text = strip_markup_text(text=contents[position:tag.start()], is_first=(position == 0))
+		if text == None:
+			return None
+		pieces.append(text)
+		position = tag.end()
+	text = strip_markup_text(text=contents[position:], is_first=(position == 0))
+	if text == None:
+		return None
+	pieces.append(text)
+	return ''.join(pieces)
+
+
 #
 #
 #	remove_lxml_markup
 #
+#		uses strip_markup_fast when it can, and BeautifulSoup for everything else
+#
 #
 def remove_lxml_markup(contents):
 	retval = ""
 	try:
-		retval = BeautifulSoup(contents, "lxml").text
-		#
-		#	that was easy. thanks BeautifulSoup
-		#
+		retval = strip_markup_fast(contents)
+		if retval == None:
+			retval = BeautifulSoup(contents, "lxml").text
+			#
+			#	that was easy. thanks BeautifulSoup
+			#
 	except Exception as e:
 		print("\n==== Exception ====\n  make_me_pretty.remove_lxml_markup()\n----")
 		print(e)
@@ -58,46 +192,45 @@ def remove_lxml_markup(contents):
 #		prepare a results worksheet
 #
 #		note: re.sub('<[^<]+?>', '', str(val)) will remove all html tags from str(val)
+#		note: the pieces are collected in a list and joined once; leading punctuation is removed with one lstrip
 #
 #
 def safe_to_write_string(contents):
-	retval = """"""
+	retval = []
 	try:
 		if isinstance(contents, str):
-			while any(contents.startswith(x) for x in NO_START_PUNCTUATION):
-				contents = contents[1:]
-			contents = contents.strip()
+			contents = contents.lstrip(NO_START_PUNCTUATION_CHARACTERS).strip()
 		if len(contents) > 0:
 			if type(contents) is dict:
 				for key,val in contents.items():
 					if key in SORT_ORDER_RISK.keys():
-						retval = retval + str(key) + """:\n"""
-						retval = retval + safe_to_write_string(val)
+						retval.append(str(key) + """:\n""")
+						retval.append(safe_to_write_string(val))
 					elif key in TARGET_DICT_KEYS:
 						if len(val) == 0:
-							retval = retval + """\n"""
+							retval.append("""\n""")
 						else:
-							retval = retval + safe_to_write_string(val)
+							retval.append(safe_to_write_string(val))
 					else:
-						retval = retval + str(key) + """\n"""
-						if (type(val) is dict or type(val) is list):
-							retval = retval + safe_to_write_string(val)
+						retval.append(str(key) + """\n""")
+						if (type(val) is dict or type(val) is list or type(val) is tuple):
+							retval.append(safe_to_write_string(val))
 						else:
-							retval = retval + str(val) + """\n"""
-			elif type(contents) is list:
+							retval.append(str(val) + """\n""")
+			elif (type(contents) is list or type(contents) is tuple):
 				for val in contents:
-					if (type(val) is dict or type(val) is list):
-						retval = retval + safe_to_write_string(val)
+					if (type(val) is dict or type(val) is list or type(val) is tuple):
+						retval.append(safe_to_write_string(val))
 					else:
-						retval = retval + str(val) + """\n"""
+						retval.append(str(val) + """\n""")
 			else:
-				retval = str(contents) + """\n"""
+				retval.append(str(contents) + """\n""")
 	except Exception as e:
 		print("\n==== Exception ====\n  make_me_pretty.safe_to_write_string()\n----")
 		print(e)
 		traceback.print_exc()
 		print("\n===================")
-	return retval
+	return "".join(retval)
 
 
 #
@@ -107,33 +240,23 @@ def safe_to_write_string(contents):
 #		fix spacing issues within a string
 #
 #		this might seem like overkill, but some security tools include unnecessary whitespace chars inside individual strings
-#		also this code gives up a little efficiency for easier readability and editability
 #		what is it with security tools adding random whitespace in various parts of strings?
 #
+#		each rule used to be "while find in contents: contents = contents.replace(find, replace_with)", which rescans and copies the
+#		whole string once per pass (e.g. one pass per '\n' in front of a ';'); now each rule gets one plain replace (enough for
+#		almost all real text) and, if that was not enough, one regex pass that finishes the job, so the time stays linear
+#
 #
 def fix_spacing_issues(contents):
 	try:
 		if (contents == None or contents == ''):
 			return ''
 		contents = contents.strip()
-		while '  ' in contents:
-			contents = contents.replace('  ', ' ')
-		while '\n ' in contents:
-			contents = contents.replace('\n ', '\n')
-		while ' \n' in contents:
-			contents = contents.replace(' \n', '\n')
-		while ' \t' in contents:
-			contents = contents.replace(' \t', '\t')
-		while '\t ' in contents:
-			contents = contents.replace('\t ', '\t')
-		while '\n\n' in contents:
-			contents = contents.replace('\n\n', '\n')
-		while '\t\t' in contents:
-			contents = contents.replace('\t\t', '\t')
-		while '\t\n' in contents:
-			contents = contents.replace('\t\n', '\n')
-		while '\n;' in contents:
-			contents = contents.replace('\n;', ';')
+		for find,replace_with,pattern in SPACING_RULES:
+			if find in contents:
+				contents = contents.replace(find, replace_with)
+				if find in contents:
+					contents = pattern.sub(replace_with, contents)
 		contents = contents.replace(' :', ':')
 		contents = contents.replace(' ;', ';')
 		contents = contents.replace(' ,', ',')
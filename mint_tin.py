@@ -0,0 +1,208 @@
+#!/usr/bin/python3
+'''
+mint_tin
+	Keep parsed breathmint issues in a local SQLite database
+
+	one row per issue, tagged with the Burp file it came from, so that repeat, filtered and multi-engagement reports can be
+	made with one indexed query instead of parsing every Burp file again
+'''
+
+#
+#
+# -- import public modules --
+#
+#
+import sqlite3
+import json
+import traceback
+
+#
+#
+# -- Global variables --
+#
+#
+ISSUE_STORE_TABLE = "issues"
+#	columns holding lists/tuples; these are stored as JSON text and come back as tuples
+ISSUE_STORE_JSON_COLUMNS = ["references", "classification", "target_details", "request_response"]
+ISSUE_STORE_INDEXED_COLUMNS = ["risk", "fqdn", "name", "source_file"]
+#	rows fetched from sqlite per round trip while streaming query results
+ISSUE_STORE_FETCH_SIZE = 1000
+
+#
+#
+# -- Function declarations --
+#
+#
+
+#
+#
+#	quote_column
+#
+#		quote a column name for use in SQL ("references" is a keyword)
+#
+#
+def quote_column(column_name):
+	return '"' + column_name.replace('"', '""') + '"'
+
+
+#
+#
+#	open_issue_store
+#
+#		open (and create, if needed) the issue database
+#
+#		parameters:
+#			db_path - SQLite database file
+#			field_names - issue attribute names in record order (see breathmint.Issue.to_record)
+#			store_version - version of the stored issue format (kept in the database's user_version)
+#
+#		returns:
+#			sqlite3 connection, or None if the database exists but was made for a different set of fields or store_version
+#
+#
+def open_issue_store(db_path, field_names, store_version=0):
+	connection = None
+	try:
+		connection = sqlite3.connect(db_path)
+		table_exists = (not connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (ISSUE_STORE_TABLE,)).fetchone() == None)
+		if table_exists == False:
+			connection.execute("PRAGMA user_version = " + str(int(store_version)))
+		elif not connection.execute("PRAGMA user_version").fetchone()[0] == store_version:
+			print("ERROR: mint_tin.open_issue_store: " + str(db_path) + " holds issues in an older/newer format; use a new database file")
+			connection.close()
+			return None
+		column_definitions = ["issue_id INTEGER PRIMARY KEY", "source_file TEXT NOT NULL", "risk_order INTEGER NOT NULL"]
+		for field_name in field_names:
+			column_definitions.append(quote_column(field_name) + " TEXT")
+		connection.execute("CREATE TABLE IF NOT EXISTS " + ISSUE_STORE_TABLE + " (" + ", ".join(column_definitions) + ")")
+		existing_columns = [row[1] for row in connection.execute("PRAGMA table_info(" + ISSUE_STORE_TABLE + ")")]
+		if not existing_columns == ["issue_id", "source_file", "risk_order"] + list(field_names):
+			print("ERROR: mint_tin.open_issue_store: " + str(db_path) + " was created for a different set of issue fields; use a new database file")
+			connection.close()
+			return None
+		for column_name in ISSUE_STORE_INDEXED_COLUMNS:
+			connection.execute("CREATE INDEX IF NOT EXISTS " + ISSUE_STORE_TABLE + "_" + column_name + " ON " + ISSUE_STORE_TABLE + " (" + quote_column(column_name) + ")")
+		#	the default report order (risk, then the order the issues were stored in)
+		connection.execute("CREATE INDEX IF NOT EXISTS " + ISSUE_STORE_TABLE + "_report_order ON " + ISSUE_STORE_TABLE + " (risk_order, issue_id)")
+		connection.commit()
+	except Exception as e:
+		print('\n==== Exception ====\n  mint_tin.open_issue_store()\n----')
+		print(e)
+		traceback.print_exc()
+		print('\n===================')
+		if not connection == None:
+			connection.close()
+		connection = None
+	return connection
+
+
+#
+#
+#	store_issues
+#
+#		replace the stored issues of one Burp file with the given records
+#
+#		parameters:
+#			connection - from open_issue_store
+#			source_file - Burp file the issues were parsed from
+#			field_names - see open_issue_store
+#			records - list of issue records (tuples in field_names order)
+#			sort_order_risk - {'<<risk>>':<<report position>>, ...}; risks not in it are sorted last
+#
+#		returns:
+#			number of issues stored
+#
+#
+def store_issues(connection, source_file, field_names, records, sort_order_risk):
+	stored = 0
+	try:
+		json_positions = [i for i in range(len(field_names)) if field_names[i] in ISSUE_STORE_JSON_COLUMNS]
+		risk_position = field_names.index("risk")
+		rows = []
+		for record in records:
+			row = list(record)
+			for i in json_positions:
+				row[i] = json.dumps(row[i])
+			rows.append([source_file, sort_order_risk.get(record[risk_position], len(sort_order_risk))] + row)
+		columns = ["source_file", "risk_order"] + list(field_names)
+		with connection:
+			connection.execute("DELETE FROM " + ISSUE_STORE_TABLE + " WHERE source_file = ?", (source_file,))
+			connection.executemany("INSERT INTO " + ISSUE_STORE_TABLE + " (" + ", ".join(quote_column(c) for c in columns) + ") VALUES (" + ", ".join("?" for c in columns) + ")", rows)
+		stored = len(rows)
+	except Exception as e:
+		print('\n==== Exception ====\n  mint_tin.store_issues()\n----')
+		print(e)
+		traceback.print_exc()
+		print('\n===================')
+	return stored
+
+
+#
+#
+#	issue_filter
+#
+#		build the WHERE clause for query_issues and count_issues
+#		every filter is a list of accepted (or, for risk_excluded, rejected) values; an empty list means no filter
+#
+#		returns:
+#			(where_sql, parameters)
+#
+#
+def issue_filter(risk_excluded=[], risk_included=[], source_files=[], fqdns=[], names=[]):
+	conditions = []
+	parameters = []
+	if not risk_excluded == []:
+		conditions.append("risk NOT IN (" + ", ".join("?" for value in risk_excluded) + ")")
+		parameters.extend(risk_excluded)
+	for column_name,values in [("risk", risk_included), ("source_file", source_files), ("fqdn", fqdns), ("name", names)]:
+		if not values == []:
+			conditions.append(quote_column(column_name) + " IN (" + ", ".join("?" for value in values) + ")")
+			parameters.extend(values)
+	if conditions == []:
+		return ("", parameters)
+	return (" WHERE " + " AND ".join(conditions), parameters)
+
+
+#
+#
+#	query_issues
+#
+#		stream the stored issues, sorted by risk, as records (tuples in field_names order)
+#		rows are fetched ISSUE_STORE_FETCH_SIZE at a time, so the result is never held in memory as a whole
+#
+#		parameters:
+#			connection, field_names - see open_issue_store
+#			risk_excluded, risk_included, source_files, fqdns, names - see issue_filter
+#
+#		returns:
+#			generator of records
+#
+#
+def query_issues(connection, field_names, risk_excluded=[], risk_included=[], source_files=[], fqdns=[], names=[]):
+	json_positions = [i for i in range(len(field_names)) if field_names[i] in ISSUE_STORE_JSON_COLUMNS]
+	where_sql, parameters = issue_filter(risk_excluded=risk_excluded, risk_included=risk_included, source_files=source_files, fqdns=fqdns, names=names)
+	cursor = connection.execute("SELECT " + ", ".join(quote_column(f) for f in field_names) + " FROM " + ISSUE_STORE_TABLE + where_sql + " ORDER BY risk_order, issue_id", parameters)
+	rows = cursor.fetchmany(ISSUE_STORE_FETCH_SIZE)
+	while not rows == []:
+		for row in rows:
+			record = list(row)
+			for i in json_positions:
+				value = json.loads(record[i])
+				if isinstance(value, list):
+					value = tuple(tuple(item) if isinstance(item, list) else item for item in value)
+				record[i] = value
+			yield tuple(record)
+		rows = cursor.fetchmany(ISSUE_STORE_FETCH_SIZE)
+
+
+#
+#
+#	count_issues
+#
+#		returns:
+#			number of stored issues matching the filters (see issue_filter)
+#
+#
+def count_issues(connection, risk_excluded=[], risk_included=[], source_files=[], fqdns=[], names=[]):
+	where_sql, parameters = issue_filter(risk_excluded=risk_excluded, risk_included=risk_included, source_files=source_files, fqdns=fqdns, names=names)
+	return connection.execute("SELECT COUNT(*) FROM " + ISSUE_STORE_TABLE + where_sql, parameters).fetchone()[0]
@@ -0,0 +1,328 @@
+#!/usr/bin/python3
+'''
+stopwatch
+	Per-stage timing and counters for breathmint runs (see '--profile')
+
+	stages are functions wrapped with instrument(); nothing is wrapped until profiling is enabled, so a normal run pays nothing
+	for each stage: call count, wall time including the stages it calls (seconds), wall time of its own code (self_seconds),
+	and, for text functions, the characters passed in (chars_in) and returned (chars_out)
+	counters (issues parsed, cells written, ...) are added with add_count
+'''
+
+#
+#
+# -- import public modules --
+#
+#
+import functools
+import json
+import time
+import traceback
+
+#
+#
+# -- Global variables --
+#
+#
+ENABLED = False
+#	{'<<stage name>>':{'calls':<<n>>, 'seconds':<<s>>, 'self_seconds':<<s>>, 'chars_in':<<n>>, 'chars_out':<<n>>}, ...}
+STAGES = {}
+#	{'<<counter name>>':<<n>>, ...}
+COUNTERS = {}
+#	time spent in called stages, one entry per stage call in progress (used to work out self_seconds)
+STACK = []
+#	{'<<stage name>>':<<calls in progress>>}; a recursive stage only adds its outermost call to 'seconds'
+ACTIVE = {}
+STARTED = None
+#	stages shown in the summary table
+SUMMARY_STAGES = 20
+
+#
+#
+# -- Function declarations --
+#
+#
+
+#
+#
+#	enable
+#
+#		turn profiling on; call instrument() for the functions that should be timed
+#
+#
+def enable():
+	global ENABLED, STARTED
+	ENABLED = True
+	if STARTED == None:
+		STARTED = time.perf_counter()
+
+
+#
+#
+#	reset
+#
+#		forget every stage and counter (e.g. at the start of a worker task, so only that task is reported back)
+#
+#
+def reset():
+	STAGES.clear()
+	COUNTERS.clear()
+
+
+#
+#
+#	new_stage
+#
+#		returns:
+#			the (new) STAGES entry for stage_name
+#
+#
+def new_stage(stage_name):
+	if not stage_name in STAGES.keys():
+		STAGES[stage_name] = {'calls':0, 'seconds':0.0, 'self_seconds':0.0, 'chars_in':0, 'chars_out':0}
+	return STAGES[stage_name]
+
+
+#
+#
+#	text_length
+#
+#		characters in the str arguments of a call
+#
+#
+def text_length(args, kwargs):
+	length = 0
+	for value in args:
+		if isinstance(value, str):
+			length += len(value)
+	for value in kwargs.values():
+		if isinstance(value, str):
+			length += len(value)
+	return length
+
+
+#
+#
+#	start_stage / stop_stage
+#
+#		bookkeeping around one call of a stage; start_stage returns the start time to hand to stop_stage
+#
+#
+def start_stage(stage_name):
+	new_stage(stage_name)['calls'] += 1
+	ACTIVE[stage_name] = ACTIVE.get(stage_name, 0) + 1
+	STACK.append(0.0)
+	return time.perf_counter()
+
+
+def stop_stage(stage_name, start):
+	elapsed = time.perf_counter() - start
+	stage = STAGES[stage_name]
+	stage['self_seconds'] += elapsed - STACK.pop()
+	ACTIVE[stage_name] -= 1
+	if ACTIVE[stage_name] == 0:
+		stage['seconds'] += elapsed
+	if not STACK == []:
+		STACK[-1] += elapsed
+
+
+#
+#
+#	timed
+#
+#		wrap function so each call is recorded as stage_name
+#
+#		parameters:
+#			function - function to wrap; lru_cache'd functions keep their cache_info()/cache_clear()
+#			stage_name - name in the report
+#			measure_text - also add up the characters of the str arguments (chars_in) and of a str result (chars_out)
+#
+#		returns:
+#			wrapped function (or function itself if it is already wrapped)
+#
+#
+def timed(function, stage_name, measure_text=False):
+	if hasattr(function, 'stopwatch_stage'):
+		return function
+
+	@functools.wraps(function)
+	def wrapper(*args, **kwargs):
+		if ENABLED == False:
+			return function(*args, **kwargs)
+		start = start_stage(stage_name=stage_name)
+		try:
+			result = function(*args, **kwargs)
+		finally:
+			stop_stage(stage_name=stage_name, start=start)
+		if measure_text == True:
+			stage = STAGES[stage_name]
+			stage['chars_in'] += text_length(args=args, kwargs=kwargs)
+			if isinstance(result, str):
+				stage['chars_out'] += len(result)
+		return result
+
+	wrapper.stopwatch_stage = stage_name
+	for attribute in ['cache_info', 'cache_clear']:
+		if hasattr(function, attribute):
+			setattr(wrapper, attribute, getattr(function, attribute))
+	return wrapper
+
+
+#
+#
+#	instrument
+#
+#		replace module.<function name> with a timed() version for each of function_names
+#		calls made through the module (module.function(), or a bare function() inside the module itself) are then recorded
+#		as '<<module_name>>.<<function name>>'
+#
+#
+def instrument(module, module_name, function_names, measure_text=False):
+	for function_name in function_names:
+		setattr(module, function_name, timed(function=getattr(module, function_name), stage_name=module_name + "." + function_name, measure_text=measure_text))
+
+
+#
+#
+#	Stage
+#
+#		context manager for timing a block of code that is not a function of its own; see stage()
+#
+#
+class Stage:
+	def __init__(self, stage_name):
+		self.stage_name = stage_name
+		self.start = None
+
+	def __enter__(self):
+		self.start = start_stage(stage_name=self.stage_name)
+		return self
+
+	def __exit__(self, exc_type, exc_value, exc_traceback):
+		stop_stage(stage_name=self.stage_name, start=self.start)
+		return False
+
+
+class NoStage:
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, exc_traceback):
+		return False
+
+
+NO_STAGE = NoStage()
+
+
+#
+#
+#	stage
+#
+#		with stopwatch.stage('<<name>>'):
+#			<<code to time>>
+#
+#
+def stage(stage_name):
+	if ENABLED == False:
+		return NO_STAGE
+	return Stage(stage_name=stage_name)
+
+
+#
+#
+#	add_count
+#
+#		add value to the counter_name counter (nothing happens when profiling is off)
+#
+#
+def add_count(counter_name, value=1):
+	if ENABLED == True:
+		COUNTERS[counter_name] = COUNTERS.get(counter_name, 0) + value
+
+
+#
+#
+#	snapshot
+#
+#		returns:
+#			{'stages':STAGES, 'counters':COUNTERS} as plain (picklable) copies; see merge
+#
+#
+def snapshot():
+	return {'stages':dict((stage_name, dict(stage)) for stage_name,stage in STAGES.items()), 'counters':dict(COUNTERS)}
+
+
+#
+#
+#	merge
+#
+#		add a snapshot (e.g. from a worker process) to this process' stages and counters
+#
+#
+def merge(stopwatch_snapshot):
+	for stage_name,stage in stopwatch_snapshot['stages'].items():
+		this_stage = new_stage(stage_name)
+		for key in this_stage.keys():
+			this_stage[key] += stage[key]
+	for counter_name,value in stopwatch_snapshot['counters'].items():
+		COUNTERS[counter_name] = COUNTERS.get(counter_name, 0) + value
+
+
+#
+#
+#	report
+#
+#		returns:
+#			{'wall_seconds':<<seconds since enable()>>, 'stages':{...}, 'counters':{...}}, stages sorted by seconds (most first)
+#
+#
+def report():
+	wall_seconds = 0.0
+	if not STARTED == None:
+		wall_seconds = time.perf_counter() - STARTED
+	stage_names = sorted(STAGES.keys(), key=lambda k: STAGES[k]['seconds'], reverse=True)
+	return {'wall_seconds':wall_seconds, 'stages':dict((stage_name, dict(STAGES[stage_name])) for stage_name in stage_names), 'counters':dict(sorted(COUNTERS.items()))}
+
+
+#
+#
+#	summary_table
+#
+#		short text version of a report (the SUMMARY_STAGES slowest stages and all counters)
+#
+#
+def summary_table(profile_report):
+	lines = []
+	lines.append("Wall time: {:.3f} s (stage times from worker processes are added up over all workers)".format(profile_report['wall_seconds']))
+	lines.append("{:<44} {:>10} {:>11} {:>11} {:>12} {:>12}".format("stage", "calls", "seconds", "self (s)", "chars in", "chars out"))
+	for stage_name,stage in list(profile_report['stages'].items())[:SUMMARY_STAGES]:
+		lines.append("{:<44} {:>10} {:>11.3f} {:>11.3f} {:>12} {:>12}".format(stage_name, stage['calls'], stage['seconds'], stage['self_seconds'], stage['chars_in'], stage['chars_out']))
+	for counter_name,value in profile_report['counters'].items():
+		lines.append("{:<44} {:>10}".format(counter_name, value))
+	return "\n".join(lines)
+
+
+#
+#
+#	write_report
+#
+#		write report() to out_filename as JSON and print the summary_table
+#
+#		returns:
+#			True|False
+#
+#
+def write_report(out_filename):
+	retval = False
+	try:
+		profile_report = report()
+		with open(out_filename, 'w') as f:
+			json.dump(profile_report, f, indent=2)
+		print(summary_table(profile_report=profile_report))
+		retval = True
+	except Exception as e:
+		print("\n==== Exception ====\n  stopwatch.write_report()\n----")
+		print(e)
+		traceback.print_exc()
+		print("\n===================")
+	return retval